@@ -1,6 +1,19 @@
 """ SET 1 - DIVIDE AND CONQUER """
 
+import heapq
+import itertools
 import math
+import os
+import pickle
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional: lists and array.array are handled without it
+    np = None
 
 def sum_of_numbers(A: list, lower: int, upper: int) -> int:
     """ Compute the sum of n numbers using divide-and-conquer strategy. """
@@ -11,6 +24,119 @@ def sum_of_numbers(A: list, lower: int, upper: int) -> int:
     return sum_of_numbers(A, lower, mid) + sum_of_numbers(A, mid+1, upper)
 
 
+SUM_BLOCK = 1 << 16 # number of items reduced at once by the summation engine
+PAIRWISE_BASE = 128 # slices of at most this size are added up sequentially
+
+
+def pairwise_sum(A, lower: int, upper: int):
+    """ Sums A[lower..upper-1] by splitting it in halves like sum_of_numbers, down to
+        slices of PAIRWISE_BASE items. The rounding error of a float sum grows as
+        O(log n) instead of O(n) for the sequential sum. """
+    if upper - lower <= PAIRWISE_BASE:
+        return sum(A[lower:upper])
+    mid = (lower + upper) // 2
+    return pairwise_sum(A, lower, mid) + pairwise_sum(A, mid, upper)
+
+
+def block_sum(block):
+    """ Pairwise sum of a single block: a list, an array.array or a NumPy array.
+        NumPy float blocks are reduced in C (np.add.reduce is itself pairwise) and
+        integer blocks are summed exactly, without int64 overflow. """
+    if np is not None and isinstance(block, np.ndarray):
+        if block.dtype.kind in "iub":
+            if len(block) == 0:
+                return 0
+            bound = max(abs(int(block.min())), abs(int(block.max())))
+            if bound * len(block) < 2**63:
+                return int(np.add.reduce(block, dtype=np.int64))
+            return sum(block.tolist())
+        return np.add.reduce(block).item()
+    return pairwise_sum(block, 0, len(block))
+
+
+def iter_blocks(A, lower: int, upper: int, block: int):
+    """ Yields the consecutive slices of A[lower..upper] of at most 'block' items.
+        Slicing a NumPy memory-mapped array reads only the pages of that slice. """
+    for start in range(lower, upper + 1, block):
+        yield A[start:min(start + block, upper + 1)]
+
+
+def iter_file_blocks(path: str, typecode: str, block: int):
+    """ Reads a binary file of machine values of the given array typecode and yields
+        them as array.array blocks of at most 'block' items, so that at most one block
+        is in memory at a time. """
+    with open(path, "rb") as file:
+        while True:
+            data = array(typecode)
+            try:
+                data.fromfile(file, block)
+            except EOFError: # the last, shorter block has still been read into 'data'
+                pass
+            if not data:
+                return
+            yield data
+
+
+def reduce_blocks(blocks, mode: str = "pairwise"):
+    """ Adds up the items of an iterable of blocks.
+        -> "pairwise": each block is summed pairwise (vectorized for NumPy blocks) and the
+           block sums are combined pairwise as they arrive, keeping O(log n) partial sums.
+        -> "kahan": Kahan compensated summation over all items.
+        -> "neumaier": Neumaier's variant, which is also accurate when an item is larger
+           in magnitude than the running sum.
+        Integer items are always summed exactly. """
+    if mode == "pairwise":
+        partial = [] # [level, sum] pairs, like the digits of a binary counter
+        for block in blocks:
+            level, total = 0, block_sum(block)
+            while partial and partial[-1][0] == level:
+                total = partial.pop()[1] + total
+                level += 1
+            partial.append([level, total])
+        total = 0
+        while partial:
+            total = partial.pop()[1] + total
+        return total
+
+    if mode not in ("kahan", "neumaier"):
+        raise ValueError(f"Unknown summation mode: {mode}")
+    total = 0
+    compensation = 0
+    for block in blocks:
+        if np is not None and isinstance(block, np.ndarray):
+            block = block.tolist()
+        for x in block:
+            if mode == "kahan":
+                y = x - compensation
+                t = total + y
+                compensation = (t - total) - y
+                total = t
+            else:
+                t = total + x
+                if abs(total) >= abs(x):
+                    compensation += (total - t) + x
+                else:
+                    compensation += (x - t) + total
+                total = t
+    return total - compensation if mode == "kahan" else total + compensation
+
+
+def summation(A, lower: int = 0, upper: int = None, mode: str = "pairwise", block: int = SUM_BLOCK):
+    """ Computes the sum of A[lower..upper] block by block, without one Python frame
+        per item as in sum_of_numbers. A may be a list, an array.array, a NumPy array or
+        a NumPy memory-mapped array; see reduce_blocks for the modes. For a list of
+        integers the result is the same as sum_of_numbers'. """
+    if upper is None:
+        upper = len(A) - 1
+    return reduce_blocks(iter_blocks(A, lower, upper, block), mode)
+
+
+def sum_file(path: str, typecode: str = "d", mode: str = "pairwise", block: int = SUM_BLOCK):
+    """ Computes the sum of a binary file of machine values (see iter_file_blocks),
+        streaming it block by block so that files larger than RAM can be summed """
+    return reduce_blocks(iter_file_blocks(path, typecode, block), mode)
+
+
 def merge(A: list, l: int, m: int, u:int):
     """ Combine the sorted portions, A[l..m-1] and A[m..u] into a single array A[l..u] """
     
@@ -54,6 +180,198 @@ def mergesort(A: list, lower: int, upper: int):
         merge(A, lower, mid, upper)
 
 
+MIN_RUN = 32 # runs shorter than this are extended with insertion sort
+
+
+def insertion_sort(A: list, l: int, u: int):
+    """ Sorts A[l..u] in place by inserting each element into the sorted
+        portion on its left. Stable, and fast on small or nearly sorted slices. """
+    for i in range(l+1, u+1):
+        item = A[i]
+        j = i - 1
+        while j >= l and item < A[j]:
+            A[j+1] = A[j]
+            j -= 1
+        A[j+1] = item
+
+
+def find_runs(A: list, l: int, u: int, min_run: int = MIN_RUN) -> list:
+    """ Splits A[l..u] into sorted runs and returns the start index of each run
+        followed by u+1. Strictly descending runs are reversed in place (which keeps
+        the sort stable) and runs shorter than 'min_run' are extended with insertion sort. """
+    starts = []
+    i = l
+    while i <= u:
+        j = i + 1
+        if j <= u and A[j] < A[i]:
+            while j <= u and A[j] < A[j-1]:
+                j += 1
+            A[i:j] = A[i:j][::-1]
+        else:
+            while j <= u and not A[j] < A[j-1]:
+                j += 1
+        if j - i < min_run:
+            j = min(i + min_run, u + 1)
+            insertion_sort(A, i, j-1)
+        starts.append(i)
+        i = j
+    starts.append(u + 1)
+    return starts
+
+
+def merge_into(src: list, dst: list, l: int, m: int, u: int):
+    """ Merges the sorted portions src[l..m-1] and src[m..u-1] into dst[l..u-1].
+        Ties are taken from the left portion, so the merge is stable. """
+    i = l
+    j = m
+    k = l
+    while i < m and j < u:
+        if src[j] < src[i]:
+            dst[k] = src[j]
+            j += 1
+        else:
+            dst[k] = src[i]
+            i += 1
+        k += 1
+    if i < m:
+        dst[k:u] = src[i:m]
+    elif j < u:
+        dst[k:u] = src[j:u]
+
+
+def mergesort_bottom_up(A: list, lower: int = 0, upper: int = None, min_run: int = MIN_RUN):
+    """ Sorts A[lower..upper] without recursion. The slice is first split into natural
+        runs (see find_runs), then adjacent runs are merged pairwise, pass after pass,
+        until a single run remains. A single auxiliary buffer is allocated for the whole
+        sort: every pass merges from one array into the other, so no slices are created
+        per merge. The result is the same as mergesort's and the sort is stable. """
+    if upper is None:
+        upper = len(A) - 1
+    if lower >= upper:
+        return
+
+    merge_runs(A, find_runs(A, lower, upper, max(1, min_run)))
+
+
+def merge_runs(A: list, starts: list):
+    """ Merges the adjacent sorted runs A[starts[k]..starts[k+1]-1] pass after pass
+        into a single sorted run, using one auxiliary buffer for all passes. """
+    if len(starts) <= 2:
+        return
+
+    lower = starts[0]
+    upper = starts[-1] - 1
+    buffer = A[:] # the only auxiliary allocation, indexed like A
+    src, dst = A, buffer
+    while len(starts) > 2:
+        merged = []
+        k = 0
+        while k + 2 < len(starts):
+            merge_into(src, dst, starts[k], starts[k+1], starts[k+2])
+            merged.append(starts[k])
+            k += 2
+        if k + 1 < len(starts): # odd run out: copy it across unchanged
+            dst[starts[k]:starts[k+1]] = src[starts[k]:starts[k+1]]
+            merged.append(starts[k])
+        merged.append(upper + 1)
+        starts = merged
+        src, dst = dst, src
+
+    if src is not A:
+        A[lower:upper+1] = src[lower:upper+1]
+
+
+def compare_mergesorts(n: int = 200_000, repeat: int = 3) -> dict:
+    """ Times mergesort against mergesort_bottom_up on random, sorted and reversed
+        inputs of size n and prints the best time of 'repeat' runs for each. """
+    import random
+    import time
+
+    inputs = {"random": [random.randint(0, n) for _ in range(n)]}
+    inputs["sorted"] = sorted(inputs["random"])
+    inputs["reversed"] = inputs["sorted"][::-1]
+
+    timings = {}
+    for name, data in inputs.items():
+        expected = sorted(data)
+        for sorter in (mergesort, mergesort_bottom_up):
+            best = math.inf
+            for _ in range(repeat):
+                A = data[:]
+                start = time.perf_counter()
+                sorter(A, 0, len(A)-1)
+                best = min(best, time.perf_counter() - start)
+                assert A == expected
+            timings[(name, sorter.__name__)] = best
+            print(f"{name:>8} {sorter.__name__:>20}: {best:.4f}s")
+    return timings
+
+
+RUN_SIZE = 100_000 # records sorted in memory at a time by external_sort
+FAN_IN = 64 # sorted runs merged at once by external_sort
+
+
+def write_run(records, directory: str) -> str:
+    """ Spills the records, in order, to a new temporary file in 'directory' and
+        returns its path """
+    with tempfile.NamedTemporaryFile("wb", dir=directory, suffix=".run", delete=False) as file:
+        for record in records:
+            pickle.dump(record, file, pickle.HIGHEST_PROTOCOL)
+    return file.name
+
+
+def read_run(path: str):
+    """ Yields the records of a run file written by write_run, one at a time """
+    with open(path, "rb") as file:
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                return
+
+
+def merge_run_files(paths: list, key, directory: str = None):
+    """ k-way merges the sorted run files with a heap holding the head record of each
+        run. Yields the records in order, or writes them to a new run file in
+        'directory' and returns its path. Ties are taken from the earlier run. """
+    merged = heapq.merge(*[read_run(path) for path in paths], key=key)
+    if directory is None:
+        return merged
+    new_path = write_run(merged, directory)
+    for path in paths:
+        os.remove(path)
+    return new_path
+
+
+def external_sort(records, key=None, run_size: int = RUN_SIZE, fan_in: int = FAN_IN,
+                  tmp_dir: str = None):
+    """ Sorts an iterable of records that may not fit in memory (e.g. the lines of a
+        file) and yields them in nondecreasing order of key(record).
+        The input is read in chunks of 'run_size' records; each chunk is sorted in memory
+        with mergesort_bottom_up and spilled to a temporary run file. The runs are then
+        merged 'fan_in' at a time, in as many passes as needed, and the last merge is
+        streamed to the caller. At most run_size records, plus one buffered record per
+        merged run, are held in memory at any time. The sort is stable. """
+    run_size = max(1, run_size)
+    fan_in = max(2, fan_in)
+    records = iter(records)
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        runs = []
+        while True:
+            chunk = [[record if key is None else key(record), i, record]
+                     for i, record in enumerate(itertools.islice(records, run_size))]
+            if not chunk:
+                break
+            mergesort_bottom_up(chunk)
+            runs.append(write_run((record for _, _, record in chunk), directory))
+            del chunk
+
+        while len(runs) > fan_in:
+            runs = [merge_run_files(runs[i:i+fan_in], key, directory)
+                    for i in range(0, len(runs), fan_in)]
+        yield from merge_run_files(runs, key)
+
+
 def swap(A:list, i:int, j:int):
     """ swap(A[i], A[j]) """
     aux = A[i]
@@ -92,15 +410,240 @@ def quicksort(A:list, l:int, r:int):
         quicksort(A, split+1, r)
 
 
+INSERTION_CUTOFF = 16 # slices of at most this size are finished by insertion sort
+NINTHER_THRESHOLD = 128 # slices larger than this use the ninther as pivot
+
+
+def median_of_three(A: list, i: int, j: int, k: int) -> int:
+    """ Returns the index of the median of A[i], A[j] and A[k] """
+    if A[i] < A[j]:
+        if A[j] < A[k]:
+            return j
+        return k if A[i] < A[k] else i
+    if A[i] < A[k]:
+        return i
+    return k if A[j] < A[k] else j
+
+
+def choose_pivot(A: list, l: int, r: int) -> int:
+    """ Returns the index of the pivot for A[l..r]: the median of the first, middle
+        and last elements, or Tukey's ninther (median of three medians of three) on
+        large slices. """
+    m = (l + r) // 2
+    if r - l + 1 > NINTHER_THRESHOLD:
+        s = (r - l + 1) // 8
+        return median_of_three(A,
+                               median_of_three(A, l, l + s, l + 2*s),
+                               median_of_three(A, m - s, m, m + s),
+                               median_of_three(A, r - 2*s, r - s, r))
+    return median_of_three(A, l, m, r)
+
+
+def partition3(A: list, l: int, r: int, pivot) -> list:
+    """ Dutch national flag partition of A[l..r] around 'pivot'. Returns [lt, gt] such
+        that A[l..lt-1] < pivot, A[lt..gt] == pivot and A[gt+1..r] > pivot. """
+    lt = l
+    i = l
+    gt = r
+    while i <= gt:
+        if A[i] < pivot:
+            A[lt], A[i] = A[i], A[lt]
+            lt += 1
+            i += 1
+        elif pivot < A[i]:
+            A[i], A[gt] = A[gt], A[i]
+            gt -= 1
+        else:
+            i += 1
+    return [lt, gt]
+
+
+def sift_down(A: list, l: int, root: int, size: int):
+    """ Restores the max-heap property of the heap stored in A[l..l+size-1]
+        below position 'root' (relative to l). """
+    item = A[l + root]
+    child = 2*root + 1
+    while child < size:
+        if child + 1 < size and A[l + child] < A[l + child + 1]:
+            child += 1
+        if not item < A[l + child]:
+            break
+        A[l + root] = A[l + child]
+        root = child
+        child = 2*root + 1
+    A[l + root] = item
+
+
+def heapsort(A: list, l: int, r: int):
+    """ Sorts A[l..r] in place by heapsort: O(n log n) in the worst case. """
+    size = r - l + 1
+    for root in range(size // 2 - 1, -1, -1):
+        sift_down(A, l, root, size)
+    for end in range(size - 1, 0, -1):
+        A[l], A[l + end] = A[l + end], A[l]
+        sift_down(A, l, 0, end)
+
+
+def introsort(A: list, l: int = 0, r: int = None):
+    """ Sorts A[l..r] by quicksort with median-of-three/ninther pivots and 3-way
+        partitioning, so sorted, reversed and duplicate-heavy inputs stay O(n log n).
+        Only the smaller side is sorted recursively (the larger one is handled by the
+        loop), which bounds the recursion depth by log n. Small slices are finished by
+        insertion sort, and a slice is handed to heapsort once the depth exceeds 2·log n. """
+    if r is None:
+        r = len(A) - 1
+    if l < r:
+        introsort_helper(A, l, r, 2 * (r - l + 1).bit_length())
+
+
+def introsort_helper(A: list, l: int, r: int, depth_limit: int):
+    """ Sorts A[l..r] with at most 'depth_limit' further levels of partitioning """
+    while r - l + 1 > INSERTION_CUTOFF:
+        if depth_limit == 0:
+            heapsort(A, l, r)
+            return
+        depth_limit -= 1
+        lt, gt = partition3(A, l, r, A[choose_pivot(A, l, r)])
+        if lt - l < r - gt:
+            introsort_helper(A, l, lt-1, depth_limit)
+            l = gt + 1
+        else:
+            introsort_helper(A, gt+1, r, depth_limit)
+            r = lt - 1
+    insertion_sort(A, l, r)
+
+
+PARALLEL_CUTOFF = 100_000 # ranges smaller than this are not split any further
+
+
+def split_range(lower: int, upper: int, depth: int, cutoff: int) -> list:
+    """ Divides A[lower..upper] into halves the way mergesort does, 'depth' levels
+        deep or until a range holds fewer than 'cutoff' items, and returns the
+        leaf ranges [l, u] from left to right. """
+    if depth == 0 or upper - lower + 1 < max(2, cutoff):
+        return [[lower, upper]]
+    mid = (lower + upper) // 2
+    return split_range(lower, mid, depth-1, cutoff) + split_range(mid+1, upper, depth-1, cutoff)
+
+
+def to_shared_array(A: list, lower: int, upper: int) -> list:
+    """ Copies A[lower..upper] into a shared memory block so that worker processes can
+        read it without pickling. Returns [block, typecode], or None when the items are
+        not all machine integers or all floats. """
+    items = A[lower:upper+1]
+    if all(type(x) is int for x in items):
+        typecode = "q"
+    elif all(type(x) is float for x in items):
+        typecode = "d"
+    else:
+        return None
+    try:
+        data = array(typecode, items)
+    except OverflowError:
+        return None
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+    block.buf[:len(data) * data.itemsize] = data.tobytes()
+    return [block, typecode]
+
+
+def sort_shared_range(name: str, typecode: str, l: int, u: int):
+    """ Worker: sorts items l..u of the shared array 'name' in place """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = block.buf.cast(typecode)
+        run = view[l:u+1].tolist()
+        mergesort_bottom_up(run)
+        view[l:u+1] = array(typecode, run)
+        view.release()
+    finally:
+        block.close()
+
+
+def sum_shared_range(name: str, typecode: str, l: int, u: int):
+    """ Worker: returns the sum of items l..u of the shared array 'name' """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = block.buf.cast(typecode)
+        total = sum(view[l:u+1].tolist())
+        view.release()
+    finally:
+        block.close()
+    return total
+
+
+def parallel_mergesort(A: list, lower: int = 0, upper: int = None,
+                       workers: int = None, cutoff: int = PARALLEL_CUTOFF):
+    """ Sorts A[lower..upper] like mergesort, but the top levels of the recursion are
+        farmed out to a pool of 'workers' processes (os.cpu_count() by default). The
+        items are copied once into shared memory; each worker sorts its leaf range in
+        place there and the parent merges the sorted leaves with merge_runs.
+        Ranges below 'cutoff' items, and lists that are not all ints or all floats,
+        are sorted serially. """
+    if upper is None:
+        upper = len(A) - 1
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or upper - lower + 1 < cutoff:
+        mergesort_bottom_up(A, lower, upper)
+        return
+    shared = to_shared_array(A, lower, upper)
+    if shared is None:
+        mergesort_bottom_up(A, lower, upper)
+        return
+
+    block, typecode = shared
+    try:
+        leaves = split_range(0, upper - lower, (workers - 1).bit_length(), cutoff)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(sort_shared_range, *zip(*[[block.name, typecode, l, u] for l, u in leaves])))
+        view = block.buf.cast(typecode)
+        A[lower:upper+1] = view[:upper-lower+1].tolist()
+        view.release()
+    finally:
+        block.close()
+        block.unlink()
+    merge_runs(A, [lower + l for l, _ in leaves] + [upper + 1])
+
+
+def parallel_sum_of_numbers(A: list, lower: int = 0, upper: int = None,
+                            workers: int = None, cutoff: int = PARALLEL_CUTOFF):
+    """ Computes the sum of A[lower..upper] by splitting it like sum_of_numbers, letting
+        a pool of 'workers' processes sum the leaf ranges out of shared memory and
+        adding the partial sums in the parent. Falls back to a serial sum below
+        'cutoff' items or when the items are not all ints or all floats. """
+    if upper is None:
+        upper = len(A) - 1
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or upper - lower + 1 < cutoff:
+        return sum(A[lower:upper+1])
+    shared = to_shared_array(A, lower, upper)
+    if shared is None:
+        return sum(A[lower:upper+1])
+
+    block, typecode = shared
+    try:
+        leaves = split_range(0, upper - lower, (workers - 1).bit_length(), cutoff)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partial_sums = list(pool.map(sum_shared_range, *zip(*[[block.name, typecode, l, u] for l, u in leaves])))
+    finally:
+        block.close()
+        block.unlink()
+    return sum(partial_sums)
+
+
 class BT_Node():
     """ 
     A binary tree node is an object which has a 'value' and may have 'left_node' and/or 'right_node.
+    It also stores the height of the subtree rooted at it, kept up to date on insertion.
+    Nodes use __slots__ instead of a per-instance __dict__, which keeps large trees compact.
     """
+    __slots__ = ("value", "left", "right", "height")
+
     def __init__(self, node_value):
         """ The node value is provided at the time of the node creation """
         self.value = node_value
         self.left = None
         self.right = None
+        self.height = 0
 
 
     def insert(self, new_value):
@@ -110,7 +653,7 @@ class BT_Node():
         When the node doesn't have a value:
             The 'new_value' is set as the node's value """
         
-        if self.value:
+        if self.value is not None:
             if new_value < self.value:
                 if self.left is None:
                     self.left = BT_Node(new_value)
@@ -121,54 +664,308 @@ class BT_Node():
                     self.right = BT_Node(new_value)
                 else:
                     self.right.insert(new_value)
+            update_height(self)
         else:
             self.value = new_value
 
 
+class AVL_Node(BT_Node):
+    """ A node of a balanced (AVL) binary tree """
+    __slots__ = ()
+
+
+def node_height(node: BT_Node) -> int:
+    """ Stored height of a subtree, -1 for the empty tree """
+    return -1 if node is None else node.height
+
+
+def update_height(node: BT_Node):
+    """ Recomputes the stored height of 'node' from its children's """
+    node.height = max(node_height(node.left), node_height(node.right)) + 1
+
+
+def rotate_left(node: AVL_Node) -> AVL_Node:
+    """ Rotates the subtree rooted at 'node' to the left and returns its new root """
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+
+def rotate_right(node: AVL_Node) -> AVL_Node:
+    """ Rotates the subtree rooted at 'node' to the right and returns its new root """
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    update_height(node)
+    update_height(pivot)
+    return pivot
+
+
+def rebalance(node: AVL_Node) -> AVL_Node:
+    """ Restores the AVL property at 'node' (whose subtrees are AVL trees differing
+        in height by at most 2) with at most two rotations, and returns the new root
+        of the subtree. """
+    update_height(node)
+    balance = node_height(node.left) - node_height(node.right)
+    if balance > 1:
+        if node_height(node.left.left) < node_height(node.left.right):
+            node.left = rotate_left(node.left)
+        return rotate_right(node)
+    if balance < -1:
+        if node_height(node.right.right) < node_height(node.right.left):
+            node.right = rotate_right(node.right)
+        return rotate_left(node)
+    return node
+
+
+def build_balanced(items: list, lower: int, upper: int) -> AVL_Node:
+    """ Builds a perfectly balanced AVL tree from the sorted, duplicate-free
+        items[lower..upper] in O(n) and returns its root """
+    if lower > upper:
+        return None
+    mid = (lower + upper) // 2
+    node = AVL_Node(items[mid])
+    node.left = build_balanced(items, lower, mid-1)
+    node.right = build_balanced(items, mid+1, upper)
+    update_height(node)
+    return node
+
+
 class BinaryTree():
-    """ A binary tree is considered as an object which consists of nodes """
-    def __init__(self, tree_items:list):
+    """ A binary tree is considered as an object which consists of nodes.
+        With balanced=True the tree is kept as an AVL tree, so that search, insertion
+        and deletion stay O(log n) whatever the order of the items. """
+    def __init__(self, tree_items:list, balanced:bool = False):
         self.__items = tree_items
-        self.root = BT_Node(self.__items[0]) # the 1st item of the list is set to be the root of the binary tree
-        self.__construct() # build the binary tree
+        self.balanced = balanced
+        self.root = None
+        if balanced:
+            self.__construct_balanced()
+        elif self.__items:
+            self.root = BT_Node(self.__items[0]) # the 1st item of the list is set to be the root of the binary tree
+            self.__construct() # build the binary tree
 
 
     def __construct(self):
         """ Build the binary tree using the provide items """
         for item in self.__items:
-            self.root.insert(item)
+            self.insert(item)
+
+
+    def __construct_balanced(self):
+        """ Build the AVL tree using the provided items: sorted items are bulk-loaded
+            in O(n), any other order is inserted one item at a time. """
+        items = self.__items
+        if all(not items[i] < items[i-1] for i in range(1, len(items))):
+            unique = [item for i, item in enumerate(items) if i == 0 or items[i-1] < item]
+            self.root = build_balanced(unique, 0, len(unique)-1)
+        else:
+            for item in items:
+                self.insert(item)
+
+
+    @classmethod
+    def from_sorted(cls, items:list):
+        """ Bulk-loads a balanced tree from items in nondecreasing order in O(n) """
+        return cls(items, balanced=True)
+
+
+    def __path_to(self, value) -> list:
+        """ Returns the nodes from the root down to the node holding 'value', or down
+            to the node under which 'value' would be inserted """
+        path = []
+        node = self.root
+        while node is not None:
+            path.append(node)
+            if value < node.value:
+                node = node.left
+            elif node.value < value:
+                node = node.right
+            else:
+                break
+        return path
+
+
+    def __retrace(self, path:list):
+        """ Updates the heights of the nodes of 'path' bottom-up after an insertion or a
+            deletion below its last node. In a balanced tree the nodes are also rebalanced,
+            relinking every subtree root that a rotation changed """
+        for i in range(len(path)-1, -1, -1):
+            node = path[i]
+            if not self.balanced:
+                update_height(node)
+                continue
+            new_root = rebalance(node)
+            if new_root is not node:
+                if i == 0:
+                    self.root = new_root
+                elif path[i-1].left is node:
+                    path[i-1].left = new_root
+                else:
+                    path[i-1].right = new_root
+
+
+    def insert(self, new_value):
+        """ Adds 'new_value' to the tree; values already present are ignored """
+        path = self.__path_to(new_value)
+        if path and path[-1].value == new_value:
+            return
+        new_node = AVL_Node(new_value) if self.balanced else BT_Node(new_value)
+        if not path:
+            self.root = new_node
+            return
+        parent = path[-1]
+        if new_value < parent.value:
+            parent.left = new_node
+        else:
+            parent.right = new_node
+        self.__retrace(path)
+
+
+    def delete(self, value) -> bool:
+        """ Removes 'value' from the tree. Returns False if it was not present """
+        path = self.__path_to(value)
+        if not path or path[-1].value != value:
+            return False
+        node = path[-1]
+        if node.left is not None and node.right is not None:
+            # Replace the value by its in-order successor, then unlink the successor
+            successor = node.right
+            path.append(successor)
+            while successor.left is not None:
+                successor = successor.left
+                path.append(successor)
+            node.value = successor.value
+            node = successor
+        child = node.left if node.left is not None else node.right
+        path.pop()
+        if not path:
+            self.root = child
+        elif path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+        self.__retrace(path)
+        return True
+
+
+    def search(self, value) -> bool:
+        """ Returns True if 'value' is stored in the tree """
+        path = self.__path_to(value)
+        return bool(path) and path[-1].value == value
+
+
+    def __contains__(self, value) -> bool:
+        return self.search(value)
+
+
+    def floor(self, value):
+        """ Returns the largest value in the tree less than or equal to 'value',
+            or None if there is none """
+        best = None
+        node = self.root
+        while node is not None:
+            if value < node.value:
+                node = node.left
+            else:
+                best = node.value
+                if not node.value < value:
+                    break
+                node = node.right
+        return best
+
+
+    def ceiling(self, value):
+        """ Returns the smallest value in the tree greater than or equal to 'value',
+            or None if there is none """
+        best = None
+        node = self.root
+        while node is not None:
+            if node.value < value:
+                node = node.right
+            else:
+                best = node.value
+                if not value < node.value:
+                    break
+                node = node.left
+        return best
+
+
+    def range(self, low, high):
+        """ Yields, in increasing order, the values v of the tree with low ≤ v ≤ high.
+            Only the subtrees that can hold such values are visited. """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                if node.value < low:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if high < node.value:
+                return
+            yield node.value
+            node = node.right
     
     
     def preorder_traversal(self, tr_root:BT_Node):
-        """ Root-Left-Right """
-        if tr_root:
-            print(tr_root.value, end=" ")
-            self.preorder_traversal(tr_root.left)
-            self.preorder_traversal(tr_root.right)
+        """ Root-Left-Right: yields the values of the subtree rooted at 'tr_root' """
+        stack = [tr_root] if tr_root else []
+        while stack:
+            node = stack.pop()
+            yield node.value
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
 
 
     def inorder_traversal(self, tr_root:BT_Node):
-        """ Left-Root-Right """
-        if tr_root:
-            self.inorder_traversal(tr_root.left)
-            print(tr_root.value, end=" ")
-            self.inorder_traversal(tr_root.right)
+        """ Left-Root-Right: yields the values of the subtree rooted at 'tr_root' """
+        stack = []
+        node = tr_root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
 
 
     def postorder_traversal(self, tr_root:BT_Node):
-        """ Left-Right-Root """
-        if tr_root:
-            self.postorder_traversal(tr_root.left)
-            self.postorder_traversal(tr_root.right)
-            print(tr_root.value, end=" ")
+        """ Left-Right-Root: yields the values of the subtree rooted at 'tr_root' """
+        stack = []
+        node = tr_root
+        last_visited = None
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            top = stack[-1]
+            if top.right and top.right is not last_visited:
+                node = top.right
+            else:
+                yield top.value
+                last_visited = stack.pop()
+
+
+    def __iter__(self):
+        """ Iterates over the values of the tree in increasing order """
+        return self.inorder_traversal(self.root)
 
 
     def height(self, node:BT_Node) -> int:
-        """ Computes recursively the height of a binary tree """
-        if node is None:
-            return -1
-        else:
-            return max(self.height(node.left), self.height(node.right)) + 1
+        """ Returns the height of the subtree rooted at 'node', which every node keeps
+            up to date as the tree changes """
+        return node_height(node)
         
 
 
@@ -179,22 +976,35 @@ if __name__ == "__main__" :
 
     print(f"The height of the binary tree is: {binary_tree.height(binary_tree.root)}")
 
-    print("Pre-order Traversal: \t [", end=" ")
-    binary_tree.preorder_traversal(binary_tree.root)
-    print("]")
+    print("Pre-order Traversal: \t [", *binary_tree.preorder_traversal(binary_tree.root), "]")
+
+    print("In-order Traversal: \t [", *binary_tree.inorder_traversal(binary_tree.root), "]")
 
-    print("In-order Traversal: \t [", end=" ")
-    binary_tree.inorder_traversal(binary_tree.root)
-    print("]")
+    print("Post-order Traversal: \t [", *binary_tree.postorder_traversal(binary_tree.root), "]")
 
-    print("Post-order Traversal: \t [", end=" ")
-    binary_tree.postorder_traversal(binary_tree.root)
-    print("]")
+    # balanced_tree = BinaryTree(A, balanced=True)
+    # balanced_tree.delete(7)
+    # print(f"Floor(6): {balanced_tree.floor(6)}, Ceiling(6): {balanced_tree.ceiling(6)}")
+    # print(f"Values in [2, 8]: {list(balanced_tree.range(2, 8))}")
 
     # quicksort(A, 0, len(A)-1)
 
+    # introsort(A)
+
     # mergesort(A, 0, len(A)-1)
 
+    # mergesort_bottom_up(A)
+
+    # compare_mergesorts()
+
+    # parallel_mergesort(A, workers=4, cutoff=2)
+
+    # print(list(external_sort(A, run_size=3, fan_in=2)))
+
     # print(f"Sorted: {A}")
 
     # print(sum_of_numbers(A, 0, len(A)-1))
+
+    # print(summation(A, mode="neumaier"))
+
+    # print(parallel_sum_of_numbers(A, workers=4, cutoff=2))
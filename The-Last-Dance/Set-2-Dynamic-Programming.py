@@ -5,7 +5,16 @@ Principle of optimality:
     An optimal solution to any instance of an optimization problem 
     is composed of optimal solutions to its subinstances.
 """
+import functools
+import hashlib
 import random
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional: the pure Python rows are used without it
+    np = None
 
 def MF_knapsack(i:int, j:int):
     """ Implements the memory function method for the knapsack problem
@@ -30,6 +39,90 @@ def MF_knapsack(i:int, j:int):
     return F[i][j]
 
 
+class KnapsackMemoSolver():
+    """ Reentrant version of MF_knapsack: every instance owns its items and its memory
+        function, so several instances can be solved at once (one thread at a time per
+        instance). Only the states (i, j) actually reached are memoized, in a dict, and
+        with 'max_states' the memo keeps at most that many states, evicting the least
+        recently used ones. The recursion of MF_knapsack is run on an explicit stack, so
+        there is no recursion depth limit on the number of items. """
+    def __init__(self, weights:list, values:list, max_states:int = None):
+        self.weights = list(weights)
+        self.values = list(values)
+        self.max_states = max_states
+        self.memo = OrderedDict()
+        self.states_evaluated = 0 # states whose value had to be computed
+        self.memo_hits = 0 # states whose value was found in the memo
+        self.__lock = threading.Lock()
+
+
+    def __remember(self, state:tuple, value):
+        self.memo[state] = value
+        if self.max_states is not None and len(self.memo) > self.max_states:
+            self.memo.popitem(last=False)
+
+
+    def __lookup(self, state:tuple):
+        """ Returns the memoized value of 'state', or None """
+        value = self.memo.get(state)
+        if value is not None:
+            self.memo_hits += 1
+            if self.max_states is not None:
+                self.memo.move_to_end(state)
+        return value
+
+
+    def solve(self, i:int = None, j:int = 0):
+        """ Returns the value of an optimal feasible subset of the first i items
+            (all of them by default) for a knapsack of capacity j """
+        if i is None:
+            i = len(self.weights)
+        with self.__lock:
+            # Each frame is [i, j, value of F(i-1, j) or None]; 'result' carries
+            # the value of the frame that was just completed to its caller.
+            stack = [[i, j, None]]
+            result = None
+            while stack:
+                frame = stack[-1]
+                i, j, without_item = frame
+                if i == 0 or j == 0:
+                    result = 0
+                    stack.pop()
+                    continue
+                if without_item is None and result is None:
+                    result = self.__lookup((i, j))
+                    if result is not None:
+                        stack.pop()
+                        continue
+                    stack.append([i-1, j, None]) # F(i-1, j)
+                    continue
+                if without_item is None:
+                    frame[2] = without_item = result
+                    result = None
+                    if j >= self.weights[i-1]:
+                        stack.append([i-1, j - self.weights[i-1], None]) # F(i-1, j-w_i)
+                        continue
+                    result = without_item
+                else:
+                    result = max(without_item, self.values[i-1] + result)
+                self.states_evaluated += 1
+                self.__remember((i, j), result)
+                stack.pop()
+            return result
+
+
+    def optimal_subset(self, W:int) -> list:
+        """ Finds the composition of an optimal subset for capacity W the way
+            get_optimal_subset does, asking the memory function instead of a table """
+        selected_items = []
+        w = W
+        for i in range(len(self.weights), 0, -1):
+            if self.solve(i, w) != self.solve(i-1, w):
+                selected_items.append(i)
+                w -= self.weights[i-1]
+        return selected_items
+
+
 def knapsack(weights:list, values:list, W:int) -> list:
     """ Applies dynamic programming approach to find the most valuable subset
         of the items that fit into the knapsack.  
@@ -68,6 +161,160 @@ def get_optimal_subset(W:int, weights:list, F: list) -> list:
 
     return selected_items
 
+
+def knapsack_last_row(weights:list, values:list, W:int):
+    """ Returns the last row F[n][0..W] of the knapsack table while keeping a single
+        row in memory: item i only needs row i-1, and updating the row from the
+        right-hand side of the capacity range reads the row i-1 values before they are
+        overwritten. With NumPy each item costs one vectorized slice operation,
+        otherwise one list comprehension. """
+    if np is not None:
+        dtype = np.float64 if any(isinstance(v, float) for v in values) else np.int64
+        row = np.zeros(W+1, dtype=dtype)
+        for w, v in zip(weights, values):
+            if w <= W:
+                np.maximum(row[w:], row[:W+1-w] + v, out=row[w:])
+        return row
+    row = [0] * (W+1)
+    for w, v in zip(weights, values):
+        if w <= W:
+            row[w:] = [max(keep, take + v) for keep, take in zip(row[w:], row)]
+    return row
+
+
+def knapsack_hirschberg(weights:list, values:list, W:int) -> list:
+    """ Solves the knapsack problem like knapsack, but in O(n + W) memory instead of
+        the (n+1) x (W+1) table. The optimal subset is recovered by divide-and-conquer
+        (Hirschberg's technique): the last rows of the two halves of the items give the
+        best split c + (W-c) of the capacity between them, and each half is then solved
+        on its share. The total work stays O(nW).
+        Returns [optimal value, selected items] with items numbered from 1, in the same
+        descending order as get_optimal_subset. """
+    selected_items = []
+    # Explicit stack of [first item, last item + 1, capacity] subproblems
+    stack = [[0, len(weights), W]]
+    while stack:
+        lower, upper, capacity = stack.pop()
+        if upper - lower == 1:
+            if weights[lower] <= capacity and values[lower] > 0:
+                selected_items.append(lower + 1)
+            continue
+        if upper <= lower or capacity < 0:
+            continue
+        mid = (lower + upper) // 2
+        left = knapsack_last_row(weights[lower:mid], values[lower:mid], capacity)
+        right = knapsack_last_row(weights[mid:upper], values[mid:upper], capacity)
+        if np is not None:
+            split = int(np.argmax(left + right[::-1]))
+        else:
+            totals = [a + b for a, b in zip(left, reversed(right))]
+            split = totals.index(max(totals))
+        stack.append([lower, mid, split])
+        stack.append([mid, upper, capacity - split])
+
+    selected_items.sort(reverse=True)
+    optimal_value = sum(values[i-1] for i in selected_items)
+    return [optimal_value, selected_items]
+
+
+class KnapsackCatalog():
+    """ A prepared knapsack solver for a fixed catalog of items: the rows of the table F
+        of knapsack are built once for capacities 0..W_max, after which the optimal
+        value for any capacity W <= W_max is F[n][W] (O(1)) and the optimal subset is
+        found by get_optimal_subset (O(n)). Items can be appended later: each one only
+        adds a row to the table. With NumPy the rows hold integers unless some value is a
+        float, like knapsack_last_row; appending a float value promotes all the rows. """
+    def __init__(self, weights:list, values:list, W_max:int):
+        self.weights = []
+        self.values = []
+        self.W_max = W_max
+        if np is not None:
+            dtype = np.float64 if any(isinstance(v, float) for v in values) else np.int64
+            self.F = [np.zeros(W_max+1, dtype=dtype)]
+        else:
+            self.F = [[0] * (W_max+1)]
+        self.__digest = hashlib.sha256(f"{W_max};".encode())
+        for w, v in zip(weights, values):
+            self.add_item(w, v)
+
+
+    @property
+    def key(self) -> str:
+        """ Content hash of the catalog: the capacity and the items, in order """
+        return self.__digest.hexdigest()
+
+
+    def add_item(self, weight:int, value:int):
+        """ Appends an item to the catalog by computing one more row of the table """
+        previous = self.F[-1]
+        W = self.W_max
+        if np is not None:
+            if isinstance(value, float) and previous.dtype != np.float64:
+                self.F = [row.astype(np.float64) for row in self.F]
+                previous = self.F[-1]
+            row = previous.copy()
+            if weight <= W:
+                np.maximum(row[weight:], previous[:W+1-weight] + value, out=row[weight:])
+        else:
+            row = previous[:]
+            if weight <= W:
+                row[weight:] = [max(keep, take + value) for keep, take in zip(previous[weight:], previous)]
+        self.weights.append(weight)
+        self.values.append(value)
+        self.F.append(row)
+        self.__digest.update(f"{weight},{value};".encode())
+
+
+    def __check(self, W:int):
+        if not 0 <= W <= self.W_max:
+            raise ValueError(f"Capacity {W} outside the prepared range 0..{self.W_max}")
+
+
+    def optimal_value(self, W:int) -> int:
+        """ Value of an optimal subset of the catalog for capacity W, in O(1) """
+        self.__check(W)
+        value = self.F[-1][W]
+        return value.item() if np is not None else value
+
+
+    def optimal_subset(self, W:int) -> list:
+        """ Items (numbered from 1) of an optimal subset for capacity W, in O(n) """
+        self.__check(W)
+        return get_optimal_subset(W, self.weights, self.F)
+
+
+    def query(self, W:int) -> list:
+        """ Returns [optimal value, selected items] for capacity W, like knapsack """
+        return [self.optimal_value(W), self.optimal_subset(W)]
+
+
+CATALOG_CACHE_SIZE = 8 # prepared catalogs kept by prepare_catalog
+catalog_cache = OrderedDict()
+
+
+def catalog_key(weights:list, values:list, W_max:int) -> str:
+    """ Content hash of a catalog, as computed by KnapsackCatalog.key """
+    digest = hashlib.sha256(f"{W_max};".encode())
+    for w, v in zip(weights, values):
+        digest.update(f"{w},{v};".encode())
+    return digest.hexdigest()
+
+
+def prepare_catalog(weights:list, values:list, W_max:int) -> KnapsackCatalog:
+    """ Returns a prepared KnapsackCatalog for the items, reusing one from the cache of
+        the CATALOG_CACHE_SIZE most recently used catalogs when the content matches """
+    key = catalog_key(weights, values, W_max)
+    catalog = catalog_cache.get(key)
+    if catalog is not None and catalog.key == key: # items may have been added since
+        catalog_cache.move_to_end(key)
+        return catalog
+    catalog = KnapsackCatalog(weights, values, W_max)
+    catalog_cache[key] = catalog
+    catalog_cache.move_to_end(key)
+    while len(catalog_cache) > CATALOG_CACHE_SIZE:
+        catalog_cache.popitem(last=False)
+    return catalog
+
 def coin_row(C:list, n:int) -> int:
     """ Applies formula (8.3 below) to find the maximum amount of money that 
         can be picked up from a coin row without picking two adjacent coins.
@@ -84,6 +331,109 @@ def coin_row(C:list, n:int) -> int:
     return F[n]
 
 
+def max_plus_product(R:tuple, L:tuple) -> tuple:
+    """ Product R ⊗ L of two 2 x 2 max-plus matrices stored as (m00, m01, m10, m11),
+        where (R ⊗ L)[i][j] = max{R[i][0] + L[0][j], R[i][1] + L[1][j]} """
+    return (max(R[0] + L[0], R[1] + L[2]), max(R[0] + L[1], R[1] + L[3]),
+            max(R[2] + L[0], R[3] + L[2]), max(R[2] + L[1], R[3] + L[3]))
+
+
+class CoinRowTree():
+    """ A segment tree over a row of coins answering coin_row on any sub-range of the
+        row, and allowing coins to change, in O(log n) per operation.
+        Formula (8.3) maps the pair [F(i-1), F(i-2)] to [F(i), F(i-1)] and, in the
+        max-plus algebra (where max plays the role of + and + the role of ×), this map
+        is the matrix
+            M(c_i) = | 0  c_i |        since  F(i)   = max{0 + F(i-1), c_i + F(i-2)}
+                     | 0   0  |               F(i-1) = max{0 + F(i-1), 0 + F(i-2)}
+        (the last line holds because F never decreases for coin values c_i ≥ 0).
+        Every node stores the product of the matrices of its range, so a range is
+        answered by combining O(log n) nodes. With NumPy the tree is built one level
+        at a time with vectorized operations, in floats if any coin value is a float. """
+    def __init__(self, C:list):
+        self.n = len(C)
+        self.size = 1
+        while self.size < max(1, self.n):
+            self.size *= 2
+        size = self.size
+        if np is not None:
+            # The four entries of the node matrices, stored as four arrays
+            dtype = np.float64 if any(isinstance(c, float) for c in C) else np.int64
+            m00 = np.zeros(2*size, dtype=dtype)
+            m01 = np.zeros(2*size, dtype=dtype)
+            m10 = np.zeros(2*size, dtype=dtype)
+            m11 = np.zeros(2*size, dtype=dtype)
+            m01[size:size+self.n] = C
+            level = size
+            while level > 1:
+                # Parents level//2..level-1, left children at even and right at odd indices
+                l, r = slice(level, 2*level, 2), slice(level+1, 2*level, 2)
+                parents = slice(level//2, level)
+                m00[parents], m01[parents], m10[parents], m11[parents] = (
+                    np.maximum(m00[r] + m00[l], m01[r] + m10[l]),
+                    np.maximum(m00[r] + m01[l], m01[r] + m11[l]),
+                    np.maximum(m10[r] + m00[l], m11[r] + m10[l]),
+                    np.maximum(m10[r] + m01[l], m11[r] + m11[l]))
+                level //= 2
+            self.tree = list(zip(m00.tolist(), m01.tolist(), m10.tolist(), m11.tolist()))
+        else:
+            self.tree = [(0, 0, 0, 0)] * (2*size)
+            for i, c in enumerate(C):
+                self.tree[size + i] = (0, c, 0, 0)
+            for p in range(size-1, 0, -1):
+                self.tree[p] = max_plus_product(self.tree[2*p+1], self.tree[2*p])
+
+
+    def __len__(self) -> int:
+        return self.n
+
+
+    def update(self, i:int, value:int):
+        """ Sets the value of coin i (numbered from 0) to 'value' """
+        if not 0 <= i < self.n:
+            raise ValueError(f"Coin {i} outside the row 0..{self.n - 1}")
+        p = self.size + i
+        self.tree[p] = (0, value, 0, 0)
+        p //= 2
+        while p >= 1:
+            self.tree[p] = max_plus_product(self.tree[2*p+1], self.tree[2*p])
+            p //= 2
+
+
+    def best(self, l:int = 0, r:int = None) -> int:
+        """ Maximum amount of money that can be picked up from the coins l..r (numbered
+            from 0) without picking two adjacent coins; best() covers the whole row and
+            equals coin_row(C, len(C)) """
+        if r is None:
+            r = self.n - 1
+        if l < 0 or r >= self.n:
+            raise ValueError(f"Range {l}..{r} outside the row 0..{self.n - 1}")
+        if l > r:
+            return 0
+        # Products of the nodes met on the left and right sides of the range,
+        # None standing for the identity matrix
+        left = None
+        right = None
+        l += self.size
+        r += self.size + 1
+        while l < r:
+            if l & 1:
+                left = self.tree[l] if left is None else max_plus_product(self.tree[l], left)
+                l += 1
+            if r & 1:
+                r -= 1
+                right = self.tree[r] if right is None else max_plus_product(right, self.tree[r])
+            l //= 2
+            r //= 2
+        if left is None:
+            M = right
+        elif right is None:
+            M = left
+        else:
+            M = max_plus_product(right, left)
+        return max(M[0], M[1]) # applied to [F(l-1), F(l-2)] = [0, 0]
+
+
 def fibonacci(n:int):
     """ Computes the nth Fibonacci number iteratively using the formula below
         F (i) = F(i-1) + F(i-2) for i = 2,3,...n
@@ -98,6 +448,67 @@ def fibonacci(n:int):
     return F[n]
 
 
+FIB_CACHE_SIZE = 1024 # values kept by fast_fibonacci
+
+
+def fibonacci_pair(n:int, modulus:int = None, memo:dict = None) -> tuple:
+    """ Returns (F(n), F(n+1)), reduced modulo 'modulus' if one is given, by fast
+        doubling over the bits of n, from the most significant one:
+            F(2k)   = F(k) * (2F(k+1) - F(k))
+            F(2k+1) = F(k)^2 + F(k+1)^2
+        which takes O(log n) multiplications. The pairs of every prefix k of the bits
+        of n are stored in 'memo' when given, and the longest prefix already there is
+        used as the starting point. """
+    if memo is None:
+        memo = {}
+    shift = n.bit_length()
+    a, b = memo.get(0, (0, 1))
+    # Skip the prefixes of n whose pairs are already known
+    low, high = 0, shift
+    while low < high:
+        mid = (low + high) // 2
+        if (n >> mid) in memo:
+            high = mid
+        else:
+            low = mid + 1
+    if (n >> low) in memo:
+        shift = low
+        a, b = memo[n >> shift]
+    while shift > 0:
+        shift -= 1
+        c = a * (2*b - a)
+        d = a*a + b*b
+        if (n >> shift) & 1:
+            a, b = d, c + d
+        else:
+            a, b = c, d
+        if modulus is not None:
+            a %= modulus
+            b %= modulus
+        memo[n >> shift] = (a, b)
+    return (a, b)
+
+
+@functools.lru_cache(maxsize=FIB_CACHE_SIZE)
+def fast_fibonacci(n:int, modulus:int = None) -> int:
+    """ Computes the nth Fibonacci number, optionally modulo 'modulus', in O(log n)
+        multiplications (see fibonacci_pair). Gives the same results as fibonacci, and
+        the FIB_CACHE_SIZE most recently computed values are cached. """
+    F = fibonacci_pair(n, modulus)[0]
+    return F if modulus is None else F % modulus
+
+
+def fibonacci_batch(N:list, modulus:int = None) -> list:
+    """ Computes F(n), optionally modulo 'modulus', for every n in N. The doubling
+        steps of the common binary prefixes of the n's are computed only once. """
+    memo = {}
+    results = []
+    for n in N:
+        F = fibonacci_pair(n, modulus, memo)[0]
+        results.append(F if modulus is None else F % modulus)
+    return results
+
+
 def robot_coin_collection(board:list) -> int:
     """ Applies dynamic programming to compute the largest number of
         coins a robot can collect on an n x m board by starting at (1, 1)
@@ -117,6 +528,74 @@ def robot_coin_collection(board:list) -> int:
     return F[n][m]
 
 
+def robot_coin_collection_streaming(rows, with_path:bool = False):
+    """ Computes the same result as robot_coin_collection while reading the board one
+        row at a time from 'rows': a list of lists, any iterator of rows, a 2D NumPy
+        array or a NumPy memory-mapped board. Only one row of F is kept:
+            F(i, j) = max{F(i-1, j), F(i, j-1)} + c_ij
+        which, with P the prefix sums of the coins c_i1..c_ij of row i, unrolls to
+            F(i, j) = P(j) + max_{k ≤ j} (F(i-1, k) - P(k-1))
+        so that with NumPy a whole row is updated with one cumulative maximum.
+        With with_path=True the function returns [coins, path], where path lists the
+        cells (row, column), numbered from 0, of an optimal route. It is rebuilt from
+        one direction bit per cell (1 when the robot came from the left), packed eight
+        to a byte, instead of the table. """
+    F = None
+    came_from_left = []
+    for i, row in enumerate(rows):
+        if np is not None:
+            coins = (np.asarray(row) != 0).astype(np.int64)
+            if F is None:
+                F = np.zeros(len(coins), dtype=np.int64)
+            P = np.cumsum(coins)
+            shifted_P = np.concatenate(([0], P[:-1])) # P(k-1)
+            best = np.maximum.accumulate(F - shifted_P)
+            if with_path:
+                # The robot came from the left when the best k lies strictly before j
+                # (always on the first row, whose cells can only be reached that way)
+                left = np.ones(len(coins), dtype=bool)
+                left[0] = False
+                if i > 0:
+                    left[1:] = best[:-1] > (F - shifted_P)[1:]
+                came_from_left.append(np.packbits(left))
+            F = P + best
+        else:
+            if F is None:
+                F = [0] * len(row)
+            left = 0
+            for j, cell in enumerate(row):
+                has_coin = 1 if cell else 0
+                from_left = j > 0 and (i == 0 or F[j-1] > F[j])
+                if from_left:
+                    F[j] = F[j-1] + has_coin
+                    left |= 1 << j
+                else:
+                    F[j] = F[j] + has_coin
+            if with_path:
+                came_from_left.append(left.to_bytes((len(row) + 7) // 8, "little"))
+
+    coins = int(F[-1]) if F is not None and len(F) else 0
+    if not with_path:
+        return coins
+
+    path = []
+    i = len(came_from_left) - 1
+    j = len(F) - 1 if F is not None else -1
+    while i >= 0 and j >= 0:
+        path.append((i, j))
+        bits = came_from_left[i]
+        if np is not None:
+            from_left = bool(bits[j // 8] & (0x80 >> (j % 8)))
+        else:
+            from_left = bool(bits[j // 8] & (1 << (j % 8)))
+        if from_left:
+            j -= 1
+        else:
+            i -= 1
+    path.reverse()
+    return [coins, path]
+
+
 if __name__ == "__main__":
     Weights = [2, 1, 3, 2]
     Values = [12, 10, 20, 15]
@@ -140,14 +619,31 @@ if __name__ == "__main__":
     selected_items = get_optimal_subset(W=capacity, weights=Weights, F=F)
     print(f"Optmial items: {selected_items}")
 
+    # solver = KnapsackMemoSolver(weights=Weights, values=Values)
+    # print(f"Optmial value: {solver.solve(j=capacity)}, states evaluated: {solver.states_evaluated}")
+    # print(f"Optmial items: {solver.optimal_subset(W=capacity)}")
+
     # optimal_value, items = knapsack(weights=Weights, values=Values, W=capacity)
     # print(f"Optmial value: {optimal_value}")
     # print(f"Optmial items: {items}")
 
+    # catalog = prepare_catalog(weights=Weights, values=Values, W_max=10)
+    # for W in range(capacity, 11):
+    #     print(f"W = {W}: {catalog.query(W)}")
+
+    # optimal_value, items = knapsack_hirschberg(weights=Weights, values=Values, W=capacity)
+    # print(f"Optmial value: {optimal_value}")
+    # print(f"Optmial items: {items}")
+
     # coins = [5, 1, 2, 10, 6, 2]
     # print(f"The maximum amount of money that can be picked up is : {coin_row(coins, len(coins))}")
+    # coin_tree = CoinRowTree(coins)
+    # coin_tree.update(3, 1)
+    # print(f"Best pickup from coins 1..4 after the update: {coin_tree.best(1, 4)}")
 
     # print(f"Fibo(5) = {fibonacci(5)}")
+
+    # print(f"Fibo(10^18) mod 10^9+7 = {fast_fibonacci(10**18, modulus=10**9 + 7)}")
     
     # coin_board = [[0,0,0,0,5,0],
     #               [0,2,0,4,0,0],
@@ -157,4 +653,6 @@ if __name__ == "__main__":
     # for i in range(len(coin_board)):
     #     print(coin_board[i])
     # print(f"Largest number of coins: {robot_coin_collection(coin_board)}")
+    # coins, path = robot_coin_collection_streaming(iter(coin_board), with_path=True)
+    # print(f"Largest number of coins: {coins}, path: {path}")
     
@@ -9,10 +9,177 @@ solution to the problem is reached. On each step the choice made must be:
                     available on that step
 -> irrevocable: once made, it cannot be changed on subsequent steps of the algorithm
 """
+import functools
+import heapq
+import json
 import math
+import mmap
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 
-def Kruskal(V:list, E:list, W:list) -> list:
+class DisjointSet():
+    """ A disjoint-set forest over the elements 0..n-1, with path compression and
+        union by rank: any sequence of m operations takes O(m α(n)) time. """
+    def __init__(self, n:int):
+        self.parent = list(range(n))
+        self.rank = [0] * n
+        self.count = n # number of disjoint sets
+
+
+    def find(self, x:int) -> int:
+        """ Returns the representative of the set containing x """
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root: # path compression
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+
+    def union(self, x:int, y:int) -> bool:
+        """ Merges the sets containing x and y. Returns False if they were already
+            the same set, i.e. if an edge x-y would close a cycle """
+        x = self.find(x)
+        y = self.find(y)
+        if x == y:
+            return False
+        if self.rank[x] < self.rank[y]:
+            x, y = y, x
+        self.parent[y] = x
+        if self.rank[x] == self.rank[y]:
+            self.rank[x] += 1
+        self.count -= 1
+        return True
+
+
+class CSRGraph():
+    """ A compact, undirected weighted graph. The vertex labels are interned once to the
+        ids 0..n-1 and the adjacency is stored in compressed sparse row (CSR) form: the
+        incident edges of vertex u are the entries offsets[u]..offsets[u+1]-1 of the
+        arrays 'targets' (the other end), 'weights' and 'edge_ids' (the index of the edge
+        in the input). The edges themselves are kept in 'edge_u', 'edge_v', 'edge_w'.
+        All of them are flat array buffers of machine values, and a graph saved with
+        save() is loaded by memory-mapping the file, without parsing or copying it.
+        Kruskal, Prim and is_cyclic accept a CSRGraph in place of (V, E, W). """
+    MAGIC = b"CSRGRAPH"
+    HEADER = struct.Struct("<qq8sq") # n, m, weight typecode, size of the labels
+
+    def __init__(self, V:list, E:list, W:list):
+        n = len(V)
+        m = len(E)
+        self.labels = list(V)
+        self.index = {v: i for i, v in enumerate(V)}
+        self.weight_type = weight_type = "q" if all(isinstance(w, int) for w in W) else "d"
+        self.edge_u = array("q", (self.index[u] for u, _ in E))
+        self.edge_v = array("q", (self.index[v] for _, v in E))
+        self.edge_w = array(weight_type, W)
+
+        # Counting sort of the 2m edge ends by vertex
+        offsets = array("q", bytes(8 * (n+1)))
+        for k in range(m):
+            offsets[self.edge_u[k] + 1] += 1
+            offsets[self.edge_v[k] + 1] += 1
+        for u in range(n):
+            offsets[u+1] += offsets[u]
+        position = offsets[:-1]
+        self.targets = array("q", bytes(8 * 2*m))
+        self.weights = array(weight_type, bytes(8 * 2*m))
+        self.edge_ids = array("q", bytes(8 * 2*m))
+        for k in range(m):
+            for a, b in ((self.edge_u[k], self.edge_v[k]), (self.edge_v[k], self.edge_u[k])):
+                p = position[a]
+                self.targets[p] = b
+                self.weights[p] = self.edge_w[k]
+                self.edge_ids[p] = k
+                position[a] += 1
+        self.offsets = offsets
+
+
+    @property
+    def n(self) -> int:
+        """ Number of vertices """
+        return len(self.labels)
+
+
+    @property
+    def m(self) -> int:
+        """ Number of edges """
+        return len(self.edge_u)
+
+
+    def neighbours(self, u:int):
+        """ Yields (neighbour id, weight, edge id) for every edge incident to vertex u """
+        targets, weights, edge_ids = self.targets, self.weights, self.edge_ids
+        for p in range(self.offsets[u], self.offsets[u+1]):
+            yield targets[p], weights[p], edge_ids[p]
+
+
+    def edge(self, k:int) -> tuple:
+        """ Returns edge k as a pair of vertex labels, like the items of E """
+        return (self.labels[self.edge_u[k]], self.labels[self.edge_v[k]])
+
+
+    def save(self, path:str):
+        """ Writes the graph to a binary file: a fixed header holding the sizes and the
+            weight typecode, the labels as UTF-8 encoded JSON, then every array, each
+            8-byte aligned. Only str and int labels can be saved, so that loading a
+            file never has to build arbitrary objects. """
+        if not all(isinstance(v, (str, int)) for v in self.labels):
+            raise TypeError("Only graphs with str or int vertex labels can be saved")
+        labels = json.dumps(self.labels).encode("utf-8")
+        with open(path, "wb") as file:
+            file.write(self.MAGIC)
+            file.write(self.HEADER.pack(self.n, self.m, self.edge_w.typecode.encode(), len(labels)))
+            file.write(labels)
+            file.write(bytes(-len(labels) % 8))
+            for data in (self.offsets, self.targets, self.weights, self.edge_ids,
+                         self.edge_u, self.edge_v, self.edge_w):
+                file.write(bytes(memoryview(data).cast("B")))
+
+
+    @classmethod
+    def load(cls, path:str):
+        """ Memory-maps a file written by save(). The arrays of the returned graph are
+            views of the mapping, so only the pages actually used are read from disk """
+        with open(path, "rb") as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapping)
+        if bytes(buffer[:8]) != cls.MAGIC:
+            raise ValueError(f"{path} is not a saved CSRGraph")
+        position = 8 + cls.HEADER.size
+        n, m, weight_type, labels_size = cls.HEADER.unpack(buffer[8:position])
+        weight_type = weight_type.rstrip(b"\0").decode()
+        if weight_type not in ("q", "d"):
+            raise ValueError(f"{path} has an unknown weight type {weight_type!r}")
+        labels = json.loads(bytes(buffer[position:position + labels_size]).decode("utf-8"))
+        position += labels_size + (-labels_size % 8)
+
+        def take(typecode:str, count:int):
+            nonlocal position
+            data = buffer[position:position + 8*count].cast(typecode)
+            position += 8*count
+            return data
+
+        graph = cls.__new__(cls)
+        graph.labels = labels
+        graph.weight_type = weight_type
+        graph.index = {v: i for i, v in enumerate(graph.labels)}
+        graph.offsets = take("q", n+1)
+        graph.targets = take("q", 2*m)
+        graph.weights = take(weight_type, 2*m)
+        graph.edge_ids = take("q", 2*m)
+        graph.edge_u = take("q", m)
+        graph.edge_v = take("q", m)
+        graph.edge_w = take(weight_type, m)
+        graph.mapping = mapping
+        return graph
+
+
+def Kruskal(V:list, E:list = None, W:list = None) -> list:
     """ 
     Looks at a minimum spanning tree of a weighted connected graph G=〈V,E〉as an 
     acyclic subgraph with |V|-1 edges for which the sum of the edge weights is the 
@@ -23,21 +190,268 @@ def Kruskal(V:list, E:list, W:list) -> list:
     their weights. Then, starting with the empty subgraph, it scans this sorted list,
     adding the next edge on the list to the current subgraph if such an inclusion does
     not create a cycle and simply skipping the edge otherwise.        
+    The edges are ordered with a heap (ties in their order in E), so the scan stops as
+    soon as |V|-1 edges are accepted, and a disjoint-set forest of the vertices tells
+    in O(α(|V|)) whether an edge creates a cycle: the whole algorithm is O(|E| log |E|).
+    For a disconnected graph the result is a minimum spanning forest.
+    V may also be a CSRGraph, in which case E and W are not needed.
     """
+    if isinstance(V, CSRGraph):
+        return [V.edge(k) for k in kruskal_edge_ids(V.n, V.edge_u, V.edge_v, V.edge_w)]
+    index = {v: i for i, v in enumerate(V)}
+    edge_u = [index[u] for u, _ in E]
+    edge_v = [index[v] for _, v in E]
+    return [E[k] for k in kruskal_edge_ids(len(V), edge_u, edge_v, W)]
+
+
+def kruskal_edge_ids(n:int, edge_u, edge_v, edge_w) -> list:
+    """ Kruskal's algorithm on the vertex ids 0..n-1: returns the indices of the
+        accepted edges, in the order they are accepted """
+    components = DisjointSet(n)
+    candidates = [(edge_w[k], k) for k in range(len(edge_w))]
+    heapq.heapify(candidates)
+
     tree_edges = []
-    encountered = 0
-    k = 0
-    while encountered < len(V) - 1:
-        new_edges = tree_edges + [E[k]]
-        if not is_cyclic(V, new_edges):
-            tree_edges = new_edges
-            encountered += 1
-        k += 1
+    while candidates and len(tree_edges) < n - 1:
+        _, k = heapq.heappop(candidates)
+        if components.union(edge_u[k], edge_v[k]):
+            tree_edges.append(k)
     return tree_edges
 
 
-def is_cyclic(V:list, E:list) -> bool:
+BORUVKA_CUTOFF = 50_000 # graphs with fewer edges are handled in a single process
+
+
+def cheapest_edges(component, edge_u, edge_v, edge_w, lower:int, upper:int) -> dict:
+    """ Scans the edges lower..upper-1 and returns, for every component, the cheapest
+        edge leaving it as a (weight, edge index) pair. Ties are broken by edge index,
+        which makes the choice consistent between components and workers. """
+    best = {}
+    for k in range(lower, upper):
+        a = component[edge_u[k]]
+        b = component[edge_v[k]]
+        if a == b:
+            continue
+        candidate = (edge_w[k], k)
+        if a not in best or candidate < best[a]:
+            best[a] = candidate
+        if b not in best or candidate < best[b]:
+            best[b] = candidate
+    return best
+
+
+def cheapest_edges_shared(names:list, typecodes:list, lower:int, upper:int) -> dict:
+    """ Worker: cheapest_edges over arrays held in shared memory blocks, which are
+        attached by name instead of being pickled """
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        views = [block.buf.cast(typecode) for block, typecode in zip(blocks, typecodes)]
+        best = cheapest_edges(*views, lower, upper)
+        for view in views:
+            view.release()
+    finally:
+        for block in blocks:
+            block.close()
+    return best
+
+
+def to_shared_memory(data) -> shared_memory.SharedMemory:
+    """ Copies an array (or a memoryview of one) into a new shared memory block """
+    block = shared_memory.SharedMemory(create=True, size=max(8, len(data) * data.itemsize))
+    block.buf[:len(data) * data.itemsize] = data.tobytes()
+    return block
+
+
+def Boruvka(V:list, E:list = None, W:list = None, workers:int = None,
+            cutoff:int = BORUVKA_CUTOFF) -> list:
+    """ Builds a minimum spanning tree (a minimum spanning forest if the graph is not
+        connected) by Borůvka's algorithm: in every round each component of the
+        current forest picks the cheapest edge leaving it, and all these edges are added
+        at once, contracting the components with a disjoint-set forest. The number of
+        components at least halves in every round, so there are at most log |V| rounds.
+        The edge scan of every round is split between a pool of 'workers' processes
+        (os.cpu_count() by default) which read the edges and the component of every
+        vertex from shared memory; graphs with fewer than 'cutoff' edges are scanned in
+        the calling process. Like Kruskal, V may be a CSRGraph, and the total weight of
+        the result is the same as Kruskal's. """
+    if isinstance(V, CSRGraph):
+        n, m = V.n, V.m
+        edge_u, edge_v, edge_w = V.edge_u, V.edge_v, V.edge_w
+        weight_type = V.weight_type
+        edge = V.edge
+    else:
+        n, m = len(V), len(E)
+        index = {v: i for i, v in enumerate(V)}
+        edge_u = array("q", (index[u] for u, _ in E))
+        edge_v = array("q", (index[v] for _, v in E))
+        weight_type = "q" if all(isinstance(w, int) for w in W) else "d"
+        edge_w = array(weight_type, W)
+        edge = E.__getitem__
+    components = DisjointSet(n)
+    component = array("q", range(n))
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and m >= cutoff
+
+    blocks = []
+    pool = None
+    if parallel:
+        blocks = [to_shared_memory(data) for data in (component, edge_u, edge_v, edge_w)]
+        names = [block.name for block in blocks]
+        typecodes = ["q", "q", "q", weight_type]
+        chunk = -(-m // workers)
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    tree_edges = []
+    try:
+        while True:
+            if parallel:
+                blocks[0].buf[:8*n] = component.tobytes()
+                ranges = [(lower, min(lower + chunk, m)) for lower in range(0, m, chunk)]
+                partial = pool.map(cheapest_edges_shared, [names] * len(ranges), [typecodes] * len(ranges),
+                                   *zip(*ranges))
+            else:
+                partial = [cheapest_edges(component, edge_u, edge_v, edge_w, 0, m)]
+            best = {}
+            for result in partial:
+                for c, candidate in result.items():
+                    if c not in best or candidate < best[c]:
+                        best[c] = candidate
+            if not best:
+                break
+            for _, k in sorted(set(best.values()), key=lambda candidate: candidate[1]):
+                if components.union(edge_u[k], edge_v[k]):
+                    tree_edges.append(k)
+            component = array("q", (components.find(u) for u in range(n)))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return [edge(k) for k in tree_edges]
+
+
+class DynamicMST():
+    """ A minimum spanning tree (or forest) kept up to date while edges are added or
+        made cheaper, without recomputing it. It is seeded with Kruskal, and each change
+        relies on the cycle property: adding an edge u-v of weight w to the tree closes a
+        single cycle, the tree path from u to v plus u-v, and the tree stays minimum if
+        the heaviest edge of that cycle is dropped. Finding the path takes O(|V|), by a
+        search of the tree only.
+        Edges are pairs of vertex labels, as in E; (u, v) and (v, u) are the same edge. """
+    def __init__(self, V:list, E:list = None, W:list = None):
+        if isinstance(V, CSRGraph):
+            E = [V.edge(k) for k in range(V.m)]
+            W = list(V.edge_w)
+            V = V.labels
+        self.weight = {}
+        for e, w in zip(E, W):
+            key = self.__key(e)
+            self.weight[key] = min(w, self.weight.get(key, w))
+        self.tree = {v: {} for v in V} # vertex -> {neighbour: weight of the tree edge}
+        self.tree_edges = {} # key -> the tree edge as it was given
+        self.total_weight = 0
+        for u, v in Kruskal(V, E, W):
+            self.__link(u, v, self.weight[self.__key((u, v))])
+
+
+    @staticmethod
+    def __key(e:tuple) -> frozenset:
+        return frozenset(e)
+
+
+    def __link(self, u, v, w):
+        self.tree[u][v] = w
+        self.tree[v][u] = w
+        self.tree_edges[self.__key((u, v))] = (u, v)
+        self.total_weight += w
+
+
+    def __cut(self, u, v):
+        self.total_weight -= self.tree[u].pop(v)
+        del self.tree[v][u]
+        del self.tree_edges[self.__key((u, v))]
+
+
+    def __tree_path(self, u, v) -> list:
+        """ Returns the vertices of the tree path from u to v, or None if u and v are
+            in different trees of the forest """
+        parent = {u: None}
+        stack = [u]
+        while stack and v not in parent:
+            x = stack.pop()
+            for y in self.tree[x]:
+                if y not in parent:
+                    parent[y] = x
+                    stack.append(y)
+        if v not in parent:
+            return None
+        path = [v]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path
+
+
+    def add_edge(self, u, v, w) -> bool:
+        """ Adds the edge u-v of weight w to the graph (and new vertices u, v if needed),
+            then updates the tree. An edge that already exists is only made cheaper, if
+            w is lower than its weight. Returns True if the tree changed. """
+        key = self.__key((u, v))
+        if key in self.weight:
+            return w < self.weight[key] and self.decrease_weight((u, v), w)
+        self.weight[key] = w
+        for x in (u, v):
+            self.tree.setdefault(x, {})
+        return self.__insert(u, v, w)
+
+
+    def decrease_weight(self, e:tuple, w) -> bool:
+        """ Lowers the weight of the existing edge e to w, then updates the tree.
+            Returns True if the tree changed. """
+        key = self.__key(e)
+        if key not in self.weight:
+            raise KeyError(f"Unknown edge {e}")
+        if w > self.weight[key]:
+            raise ValueError(f"The weight of {e} can only decrease: {w} > {self.weight[key]}")
+        self.weight[key] = w
+        u, v = e
+        if v in self.tree[u]: # a cheaper tree edge keeps the tree minimum
+            self.total_weight -= self.tree[u][v] - w
+            self.tree[u][v] = self.tree[v][u] = w
+            return True
+        return self.__insert(u, v, w)
+
+
+    def __insert(self, u, v, w) -> bool:
+        """ Applies the cycle property to the non-tree edge u-v of weight w """
+        if u == v:
+            return False
+        path = self.__tree_path(u, v)
+        if path is None: # u-v joins two trees of the forest
+            self.__link(u, v, w)
+            return True
+        heaviest = max(range(len(path) - 1), key=lambda i: self.tree[path[i]][path[i+1]])
+        x, y = path[heaviest], path[heaviest + 1]
+        if self.tree[x][y] <= w:
+            return False
+        self.__cut(x, y)
+        self.__link(u, v, w)
+        return True
+
+
+    def edges(self) -> list:
+        """ Returns the edges of the current tree, each as a pair of vertex labels """
+        return list(self.tree_edges.values())
+
+
+def is_cyclic(V:list, E:list = None) -> bool:
     """ Returns True if the graph G =〈V,E〉contains a cycle, False otherwise. """
+    if isinstance(V, CSRGraph):
+        # An undirected graph has a cycle iff one of its edges joins two vertices
+        # that the previous edges already connect
+        components = DisjointSet(V.n)
+        return not all(components.union(V.edge_u[k], V.edge_v[k]) for k in range(V.m))
     visited = [""] * len(V)
     for v in V:
         if v not in visited:
@@ -77,32 +491,55 @@ def sort_graph(E:list, W:list) :
             W[min_index], W[i] = W[i], W[min_index] 
 
 
-def Prim(V: list, E:list, W:list) -> list:
+def adjacency_lists(V:list, E:list, W:list) -> list:
+    """ Returns, for each vertex V[i], the list of its incident edges as
+        (weight, edge index, neighbour index) triples. Built once in O(|V| + |E|). """
+    index = {v: i for i, v in enumerate(V)}
+    adjacency = [[] for _ in V]
+    for k, (u, v) in enumerate(E):
+        adjacency[index[u]].append((W[k], k, index[v]))
+        adjacency[index[v]].append((W[k], k, index[u]))
+    return adjacency
+
+
+def Prim(V: list, E:list = None, W:list = None) -> list:
     """ Constructs a minimum spanning tree through a sequence of expanding subtrees. 
         The initial subtree in such a sequence consists of the first vertex of the set 
         of vertices. On each iteration, the algorithm expands the current tree in the 
         greedy manner by simply attaching to it a vertex not in the tree connected to a 
         vertex in the tree by an edge of the smallest weight. The algorithm stops after 
-        all the graph's vertices have been included in the tree being constructed.  """
+        all the graph's vertices have been included in the tree being constructed.
+        The edges leaving the tree are kept in a heap (ties in their order in E), and
+        entries whose other end has joined the tree in the meantime are skipped when
+        popped, which makes the algorithm O(|E| log |V|).
+        V may also be a CSRGraph, in which case E and W are not needed. """
+    if isinstance(V, CSRGraph):
+        G = V
+        V = G.labels
+        edge = G.edge
+        incident = lambda u: [(w, k, v) for v, w, k in G.neighbours(u)]
+    else:
+        adjacency = adjacency_lists(V, E, W)
+        edge = E.__getitem__
+        incident = adjacency.__getitem__
+    if not V:
+        return [[], []]
+    in_tree = [False] * len(V)
+    in_tree[0] = True
     tree_vertices = [V[0]]
     tree_edges = []
-    for i in range(1,len(V)):
-        min_weight = math.inf
-        min_vertex = None
-        min_edge = None
-        for j in range(len(E)):
-            if E[j][0] in tree_vertices and E[j][1] not in tree_vertices and W[j] < min_weight:
-                min_weight = W[j]
-                min_vertex = E[j][1]
-                min_edge = E[j]
-            elif E[j][1] in tree_vertices and E[j][0] not in tree_vertices and W[j] < min_weight:
-                min_weight = W[j]
-                min_vertex = E[j][0]
-                min_edge = E[j]
-        if min_vertex is None or min_vertex in tree_vertices:
+    frontier = list(incident(0))
+    heapq.heapify(frontier)
+    while frontier and len(tree_vertices) < len(V):
+        _, k, v = heapq.heappop(frontier)
+        if in_tree[v]: # stale entry: v was reached by a lighter edge
             continue
-        tree_vertices.append(min_vertex)
-        tree_edges.append(min_edge)
+        in_tree[v] = True
+        tree_vertices.append(V[v])
+        tree_edges.append(edge(k))
+        for entry in incident(v):
+            if not in_tree[entry[2]]:
+                heapq.heappush(frontier, entry)
     
     return [tree_vertices, tree_edges]
 
@@ -165,6 +602,110 @@ def change_making(amount: int, denoms:list) -> list:
     return change
 
 
+CHANGE_CACHE_SIZE = 32 # denomination systems kept by change_maker
+
+
+class ChangeMaker():
+    """ Gives change with the least number of coins for any amount, with the
+        denominations 'denoms' (each available in unlimited quantity).
+        On creation the system is tested once for being canonical, i.e. for greedy
+        change (change_making) always being optimal. Kozen and Zaks showed that if it is
+        not, the smallest amount where greedy fails is below d1 + d2, the sum of the two
+        largest denominations, so comparing greedy with the optimum up to there decides.
+        A canonical system answers with the O(m) greedy algorithm. Otherwise, amounts are
+        answered from a table of optimal coin counts C(x) = 1 + min{C(x - d) : d ≤ x}, which
+        only needs to go up to B = d1 x (d2 + ... + dm): an optimal change never uses a
+        smaller coin d1 times or more (d1 coins d would be worth d coins d1), so above B
+        it always contains a d1 coin and C(x) = 1 + C(x - d1). """
+    def __init__(self, denoms:list):
+        self.denoms = sorted(set(denoms), reverse=True)
+        if not self.denoms or self.denoms[-1] <= 0:
+            raise ValueError(f"Denominations must be positive: {denoms}")
+        largest = self.denoms[0]
+        self.bound = max(largest, largest * sum(self.denoms[1:]))
+        # Optimal coin counts (-1 when there is no change) and the last coin used
+        self.counts = array("q", [0])
+        self.last_coin = array("q", [0])
+        self.__extend_table(sum(self.denoms[:2]))
+        self.is_canonical = self.denoms[-1] == 1 and all(
+            sum(n for n, _ in change_making(x, self.denoms)) == self.counts[x]
+            for x in range(len(self.counts)))
+        if not self.is_canonical:
+            self.__extend_table(self.bound)
+
+
+    def __extend_table(self, upper:int):
+        """ Fills the table of optimal coin counts up to the amount 'upper' """
+        for x in range(len(self.counts), upper + 1):
+            best = -1
+            best_coin = 0
+            for d in self.denoms:
+                if d <= x and self.counts[x - d] >= 0 and (best < 0 or self.counts[x - d] + 1 < best):
+                    best = self.counts[x - d] + 1
+                    best_coin = d
+            self.counts.append(best)
+            self.last_coin.append(best_coin)
+
+
+    def __check(self, amount:int):
+        if amount < 0:
+            raise ValueError(f"Amount must not be negative: {amount}")
+
+
+    def __reduce(self, amount:int) -> list:
+        """ Splits 'amount' into [number of d1 coins, rest], with rest inside the table """
+        largest = self.denoms[0]
+        if amount < self.bound:
+            return [0, amount]
+        extra = (amount - self.bound) // largest + 1
+        return [extra, amount - extra * largest]
+
+
+    def min_coins(self, amount:int) -> int:
+        """ Least number of coins adding up to 'amount', or None if there is no change """
+        self.__check(amount)
+        if self.is_canonical:
+            return sum(n for n, _ in change_making(amount, self.denoms))
+        extra, rest = self.__reduce(amount)
+        count = self.counts[rest]
+        return None if count < 0 else extra + count
+
+
+    def make_change(self, amount:int) -> list:
+        """ Returns the optimal change as [(n1, d1), (n2, d2), ...] pairs in decreasing
+            order of denomination, like change_making, or None if there is no change """
+        self.__check(amount)
+        if self.is_canonical:
+            return change_making(amount, self.denoms)
+        extra, rest = self.__reduce(amount)
+        if self.counts[rest] < 0:
+            return None
+        coins = {self.denoms[0]: extra} if extra else {}
+        while rest > 0:
+            d = self.last_coin[rest]
+            coins[d] = coins.get(d, 0) + 1
+            rest -= d
+        return [(coins[d], d) for d in self.denoms if d in coins]
+
+
+@functools.lru_cache(maxsize=CHANGE_CACHE_SIZE)
+def cached_change_maker(denoms:tuple) -> ChangeMaker:
+    """ ChangeMaker of a system given as a tuple in decreasing order """
+    return ChangeMaker(list(denoms))
+
+
+def change_maker(denoms:list) -> ChangeMaker:
+    """ Returns the ChangeMaker of a denomination system, reusing the tables of the
+        CHANGE_CACHE_SIZE most recently used systems """
+    return cached_change_maker(tuple(sorted(set(denoms), reverse=True)))
+
+
+def optimal_change(amount:int, denoms:list) -> list:
+    """ Gives change for 'amount' with the least number of coins of the denominations
+        'denoms', whether or not greedy change is optimal for them """
+    return change_maker(denoms).make_change(amount)
+
+
 if __name__ == "__main__":
     # # Prim'a Algorithm: Test case 3
     # vertices =['a','b','c','d','e']
@@ -187,6 +728,17 @@ if __name__ == "__main__":
     print(Kruskal(V=vertices, E=edges, W=weights))
     print(Prim(V=vertices, E=edges, W=weights)[1])
 
+    # graph = CSRGraph(V=vertices, E=edges, W=weights)
+    # graph.save("graph.csr")
+    # graph = CSRGraph.load("graph.csr")
+    # print(Kruskal(graph), is_cyclic(graph))
+    # print(Boruvka(graph, workers=4, cutoff=1))
+
+    # mst = DynamicMST(V=vertices, E=edges, W=weights)
+    # mst.add_edge('c', 'e', 1)
+    # mst.decrease_weight(('a', 'f'), 1)
+    # print(mst.total_weight, mst.edges())
+
     # Prim'a Algorithm: Test case 1
     # vertices = ['a','b','c','d']
     # edges = [('a','b'),('a','c'),('a','d'),('c','d')]
@@ -203,3 +755,6 @@ if __name__ == "__main__":
     # print(f"Feasible solution: \t{all_solutions}")
 
     # print(change_making(amount, denominations))
+
+    # print(optimal_change(amount, denominations))
+    # print(change_maker(denominations).is_canonical)
@@ -1,53 +1,362 @@
 """ SET 4 - BACKTRACKING """
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-def n_queens(n:int):
+
+def n_queens(n:int) -> list:
     """ Applies DFS to find all feasible solutions to the problem is to place n queens
     on an n x n chessboard so that no two queens attack each other by being in the same
-    row or in the same column or on the same diagonal.  """
+    row or in the same column or on the same diagonal.
+    Returns the solutions found by n_queens_solutions, each as the list of the columns
+    (numbered from 1) of the queens of rows 1..n. """
+    return list(n_queens_solutions(n))
+
+
+def n_queens_state(n:int, prefix:list) -> list:
+    """ Returns the bitmasks [columns, left diagonals, right diagonals] attacked on the
+        row after the queens of 'prefix' (their columns, numbered from 1), or None if
+        two of these queens attack each other """
+    full = (1 << n) - 1
+    cols = left = right = 0
+    for c in prefix:
+        bit = 1 << (c - 1)
+        if bit & (cols | left | right):
+            return None
+        cols |= bit
+        left = ((left | bit) << 1) & full
+        right = (right | bit) >> 1
+    return [cols, left, right]
+
 
-    global Visited
-    global Solutions
+def n_queens_extensions(n:int, prefix:list):
+    """ Yields every solution to the n-queens problem whose first rows hold the queens
+        of 'prefix', as the list of the columns (numbered from 1) of rows 1..n.
+        The search is a DFS on an explicit stack, one row at a time. The columns and
+        the two kinds of diagonals already attacked are kept as the bits of three
+        integers, so the free squares of a row are found with a few bitwise operations
+        instead of by checking the queens placed so far: shifting the diagonal masks by
+        one bit moves them to the next row. """
+    state = n_queens_state(n, prefix)
+    if state is None or n < 1:
+        return
+    if len(prefix) == n:
+        yield list(prefix)
+        return
+    full = (1 << n) - 1
+    cols, left, right = state
+    columns = [1 << (c - 1) for c in prefix] + [0] * (n - len(prefix))
+    # Each frame: [row, squares still to try, columns, left diagonals, right diagonals]
+    stack = [[len(prefix), full & ~(cols | left | right), cols, left, right]]
+    while stack:
+        frame = stack[-1]
+        row, free, cols, left, right = frame
+        if not free:
+            stack.pop()
+            continue
+        bit = free & -free
+        frame[1] = free ^ bit
+        columns[row] = bit
+        if row == n - 1:
+            yield [c.bit_length() for c in columns]
+            continue
+        cols |= bit
+        left = ((left | bit) << 1) & full
+        right = (right | bit) >> 1
+        stack.append([row + 1, full & ~(cols | left | right), cols, left, right])
 
-    if n == 1:
-        Solutions.append([n])
+
+def n_queens_solutions(n:int, symmetry:bool = True):
+    """ Yields every solution to the n-queens problem as the list of the columns
+        (numbered from 1) of the queens of rows 1..n, using the bitmask search of
+        n_queens_extensions.
+        With symmetry=True only the queens of the left half of row 1 are tried, and the
+        mirror image of every solution found is yielded as well. """
+    if not symmetry:
+        yield from n_queens_extensions(n, [])
         return
-    if n == 2 or n == 3 or n < 1:
+    for c in range(1, (n + 1) // 2 + 1):
+        is_middle = n % 2 == 1 and c == (n + 1) // 2 # the middle column is its own mirror image
+        for solution in n_queens_extensions(n, [c]):
+            yield solution
+            if not is_middle:
+                yield [n + 1 - column for column in solution]
+
+
+def n_queens_count_from(n:int, prefix:list) -> int:
+    """ Counts the solutions to the n-queens problem that extend 'prefix', with the
+        bitmask search of n_queens_extensions but without building any board """
+    state = n_queens_state(n, prefix)
+    if state is None or n < 1:
+        return 0
+    if len(prefix) == n:
+        return 1
+    full = (1 << n) - 1
+    last_row = n - 1
+
+    def count(row:int, cols:int, left:int, right:int) -> int:
+        free = full & ~(cols | left | right)
+        if row == last_row: # at most one free square is left on the last row
+            return 1 if free else 0
+        total = 0
+        while free:
+            bit = free & -free
+            free ^= bit
+            total += count(row + 1, cols | bit, ((left | bit) << 1) & full, (right | bit) >> 1)
+        return total
+
+    return count(len(prefix), *state)
+
+
+def n_queens_count(n:int) -> int:
+    """ Counts the solutions to the n-queens problem, with the search halved by mirror
+        symmetry: a solution starting in the left half of row 1 counts for itself and
+        for its mirror image """
+    return sum(n_queens_symmetry_weight(n, [c]) * n_queens_count_from(n, [c])
+               for c in range(1, (n + 1) // 2 + 1))
+
+
+def n_queens_symmetry_weight(n:int, prefix:list) -> int:
+    """ Number of solutions a solution extending 'prefix' stands for under mirror
+        symmetry: 2 left of the middle of row 1, 1 on the middle column, 0 right of it """
+    first = prefix[0]
+    if 2 * first < n + 1:
+        return 2
+    return 1 if 2 * first == n + 1 else 0
+
+
+def n_queens_prefixes(n:int, depth:int) -> list:
+    """ Returns, in the order of the DFS, every placement of queens on the first
+        'depth' rows in which no two queens attack each other """
+    prefixes = [[]]
+    for _ in range(min(depth, n)):
+        prefixes = [prefix + [c] for prefix in prefixes for c in range(1, n + 1)
+                    if n_queens_state(n, prefix + [c]) is not None]
+    return prefixes
+
+
+def n_queens_solutions_from(n:int, prefix:list) -> list:
+    """ Worker: the solutions extending 'prefix', as a list """
+    return list(n_queens_extensions(n, prefix))
+
+
+def parallel_n_queens_count(n:int, workers:int = None, depth:int = 2, chunksize:int = 4) -> int:
+    """ Counts the solutions to the n-queens problem on a pool of 'workers' processes
+        (os.cpu_count() by default). The search tree is split into the independent
+        subtrees below every valid placement of the first 'depth' rows, with row 1
+        restricted to its left half by mirror symmetry; the subtrees are dispatched to
+        the workers in chunks of 'chunksize' and their counts are added up. The result
+        is the same as n_queens_count's. """
+    if n < 1:
+        return 0
+    prefixes = [prefix for prefix in n_queens_prefixes(n, max(1, depth))
+                if n_queens_symmetry_weight(n, prefix) > 0]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        counts = pool.map(n_queens_count_from, [n] * len(prefixes), prefixes, chunksize=chunksize)
+        return sum(n_queens_symmetry_weight(n, prefix) * count for prefix, count in zip(prefixes, counts))
+
+
+def parallel_n_queens_solutions(n:int, workers:int = None, depth:int = 2, window:int = None):
+    """ Yields the solutions to the n-queens problem, in the same order as
+        n_queens_solutions(n, symmetry=False), while a pool of 'workers' processes
+        searches the subtrees below the valid placements of the first 'depth' rows.
+        At most 'window' subtrees (2 per worker by default) are in flight or waiting to
+        be consumed, which bounds the memory held by solutions not yet yielded. """
+    if n < 1:
         return
-    for i in range(1, n+1):
-        if len(Visited) == n: # We have found a solution
-            bounded = n_queens_bound(Visited[-3], Visited[-2])
-            if not bounded:
-                Solutions.append(Visited)
-        Visited = []
-        n_queens_solver(n, [i])
-    
-
-def n_queens_solver(n:int, stack:list):
-    """ Perform DFS on a single branch """
-    global Visited
-    global Solutions
-
-    cur_pos = stack.pop()
-    Visited.append(cur_pos)
-    remaining_positions = [x for x in range(1, n+1) if x not in Visited]
-    for pos in remaining_positions:
-        bounded = n_queens_bound(cur_pos, pos)
-        if not bounded:
-            stack.append(pos)
-            n_queens_solver(n, stack)
-            
-
-def n_queens_bound(cur_pos:int, to_pos:int) -> bool:
-    adj_to_cur_pos = [cur_pos-1, cur_pos+1]
-    if to_pos in adj_to_cur_pos:
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    prefixes = iter(n_queens_prefixes(n, max(1, depth)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque(pool.submit(n_queens_solutions_from, n, prefix)
+                                    for prefix in itertools.islice(prefixes, window))
+        while pending:
+            solutions = pending.popleft().result()
+            for prefix in itertools.islice(prefixes, 1):
+                pending.append(pool.submit(n_queens_solutions_from, n, prefix))
+            yield from solutions
+
+
+class Backtracking():
+    """ A reusable backtracking engine. The state-space tree is explored depth-first
+        with an explicit stack, and the problem is described by callbacks on states:
+        -> children(state): the states obtained by extending a partial solution, in
+           the order they should be explored
+        -> is_solution(state): True if the state is a complete solution; solutions are
+           yielded and not extended any further
+        -> feasible(state): False if the state violates the problem's constraints
+        -> bound(state): False if no solution can be reached from the state
+        A state failing feasible or bound is pruned: it is neither checked nor
+        extended. The engine counts the nodes visited and the nodes pruned. """
+    def __init__(self, children, is_solution, feasible = None, bound = None):
+        self.children = children
+        self.is_solution = is_solution
+        self.feasible = feasible
+        self.bound = bound
+        self.nodes_visited = 0
+        self.nodes_pruned = 0
+
+
+    def search(self, root):
+        """ Yields the solution states of the tree rooted at 'root', in DFS order """
+        self.nodes_visited = 0
+        self.nodes_pruned = 0
+        stack = [root]
+        while stack:
+            state = stack.pop()
+            if (self.feasible is not None and not self.feasible(state)) or \
+               (self.bound is not None and not self.bound(state)):
+                self.nodes_pruned += 1
+                continue
+            self.nodes_visited += 1
+            if self.is_solution(state):
+                yield state
+                continue
+            stack.extend(reversed(list(self.children(state))))
+
+
+    def first(self, root):
+        """ Returns the first solution state found, or None """
+        return next(self.search(root), None)
+
+
+class SubsetSum():
+    """ Finds the subsets of a set S of positive integers whose sum is d.
+        The items are sorted in increasing order and a state (i, total, chosen) says
+        that items 0..i-1 have been decided, 'total' being the sum of those taken and
+        the bits of 'chosen' telling which ones. A state is pruned when
+        -> total + s_i > d: even the smallest remaining item overshoots d
+        -> total + s_i + ... + s_n < d: taking all remaining items still falls short
+        the latter with suffix sums computed once. """
+    def __init__(self, S:list, d:int):
+        self.items = sorted(S)
+        self.d = d
+        n = len(self.items)
+        self.suffix = [0] * (n + 1) # suffix[i] = s_i + ... + s_n
+        for i in range(n - 1, -1, -1):
+            self.suffix[i] = self.suffix[i+1] + self.items[i]
+        self.engine = Backtracking(children=self.__children, is_solution=self.__is_solution,
+                                   feasible=self.__feasible, bound=self.__bound)
+
+
+    def __children(self, state:tuple) -> list:
+        i, total, chosen = state
+        if i == len(self.items):
+            return []
+        return [(i + 1, total + self.items[i], chosen | (1 << i)), (i + 1, total, chosen)]
+
+
+    def __is_solution(self, state:tuple) -> bool:
+        return state[1] == self.d
+
+
+    def __feasible(self, state:tuple) -> bool:
+        i, total, _ = state
+        return total == self.d or (i < len(self.items) and total + self.items[i] <= self.d)
+
+
+    def __bound(self, state:tuple) -> bool:
+        i, total, _ = state
+        return total + self.suffix[i] >= self.d
+
+
+    def __decode(self, state:tuple) -> list:
+        chosen = state[2]
+        return [s for i, s in enumerate(self.items) if chosen >> i & 1]
+
+
+    def solutions(self):
+        """ Yields every subset (as a list in increasing order) whose sum is d """
+        for state in self.engine.search((0, 0, 0)):
+            yield self.__decode(state)
+
+
+    def first_solution(self) -> list:
+        """ Returns the first subset found whose sum is d, or None """
+        state = self.engine.first((0, 0, 0))
+        return None if state is None else self.__decode(state)
+
+
+class HamiltonianCircuit():
+    """ Finds the Hamiltonian circuits of an undirected graph G = 〈V,E〉, starting and
+        ending at V[0], in graphs of at least 3 vertices. The neighbours of every vertex
+        are kept as a bitset, and a state (last vertex, visited vertices, path) only
+        branches to the unvisited neighbours of its last vertex: adj[last] & ~visited.
+        A state is pruned when an unvisited vertex has no neighbour left through which
+        the circuit could pass it. """
+    def __init__(self, V:list, E:list):
+        self.V = V
+        index = {v: i for i, v in enumerate(V)}
+        self.adjacency = [0] * len(V)
+        for u, v in E:
+            if u != v:
+                self.adjacency[index[u]] |= 1 << index[v]
+                self.adjacency[index[v]] |= 1 << index[u]
+        self.all_visited = (1 << len(V)) - 1
+        self.engine = Backtracking(children=self.__children, is_solution=self.__is_solution,
+                                   bound=self.__bound)
+
+
+    def __children(self, state:tuple) -> list:
+        last, visited, path = state
+        children = []
+        free = self.adjacency[last] & ~visited
+        while free:
+            bit = free & -free
+            free ^= bit
+            v = bit.bit_length() - 1
+            children.append((v, visited | bit, path + (v,)))
+        return children
+
+
+    def __is_solution(self, state:tuple) -> bool:
+        last, visited, _ = state
+        return visited == self.all_visited and self.adjacency[last] & 1 == 1
+
+
+    def __bound(self, state:tuple) -> bool:
+        last, visited, _ = state
+        # The circuit enters and leaves every unvisited vertex through two distinct
+        # neighbours, each unvisited or one of the two ends of the path
+        unvisited = self.all_visited & ~visited
+        open_ends = unvisited | (1 << last) | 1
+        remaining = unvisited
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            links = self.adjacency[bit.bit_length() - 1] & open_ends
+            if links & (links - 1) == 0: # fewer than two
+                return False
         return True
-    return False
+
+
+    def circuits(self):
+        """ Yields every Hamiltonian circuit as the list of its vertices, from V[0]
+            back to V[0]. Each circuit is found in both directions. """
+        if len(self.V) < 3:
+            return
+        for _, _, path in self.engine.search((0, 1, (0,))):
+            yield [self.V[i] for i in path] + [self.V[0]]
+
+
+    def first_circuit(self) -> list:
+        """ Returns the first Hamiltonian circuit found, or None """
+        return next(self.circuits(), None)
+
 
 if __name__ == "__main__" :
-    Visited = []
-    Solutions = []
+    print(n_queens(4))
+
+    # for solution in n_queens_solutions(8):
+    #     print(solution)
+    # print(f"Number of solutions for n = 12: {n_queens_count(12)}")
+    # print(f"Number of solutions for n = 14: {parallel_n_queens_count(14, workers=4)}")
 
-    n_queens(4)
+    # subset_sum = SubsetSum(S=[3, 5, 6, 7], d=15)
+    # print(f"Subsets: {list(subset_sum.solutions())}, nodes visited: {subset_sum.engine.nodes_visited}")
 
-    # print(Visited)
-    print(Solutions)
+    # vertices = ['a', 'b', 'c', 'd', 'e', 'f']
+    # edges = [('a','b'), ('a','c'), ('a','d'), ('b','c'), ('b','e'), ('b','f'),
+    #          ('c','d'), ('c','e'), ('d','f'), ('e','f')]
+    # print(f"Hamiltonian circuit: {HamiltonianCircuit(vertices, edges).first_circuit()}")
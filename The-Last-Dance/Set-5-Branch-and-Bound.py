@@ -1,21 +1,50 @@
 """ SET 5 - BRANCH AND BOUND """
+import bisect
+import heapq
+import itertools
 import math
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 ######## GLOBAL CONSTANTS #########
 YES = 1
 NO = 0
 
 class Node():
-    """ A node is made up of a set of branches that make up the path to it, an upper 
-        bound and the cost of getting to it. """
-    def __init__(self, path:list, u:float, c:float):
-        self.path = path
+    """ A node is the last branch of the path to it: its item and whether that item is
+        included, with a pointer to its parent node. It also has an upper bound and the
+        cost of getting to it, and carries the total weight and value of the items
+        included along its path, from which the bounds of its children are derived
+        without replaying the path. Nodes share their ancestors instead of copying the
+        path, and use __slots__, so each takes constant memory whatever its depth. """
+    __slots__ = ("parent", "item", "is_included", "upper", "cost", "weight", "value")
+
+    def __init__(self, parent, b_item:int, include:int, u:float, c:float, w:int = 0, v:int = 0):
+        self.parent = parent
+        self.item = b_item
+        self.is_included = include
         self.upper = u
         self.cost = c
+        self.weight = w
+        self.value = v
+
+    def path(self) -> list:
+        """ Reconstructs the branches of the path from the origin to this node """
+        path = []
+        node = self
+        while node is not None:
+            path.append(Branch(b_item=node.item, include=node.is_included))
+            node = node.parent
+        path.reverse()
+        return path
 
     def show(self):
         print("NODE INFO:\n\tPath:[", end="")
-        for branch in self.path[1:]: # Don't display the origin as a branch
+        for branch in self.path()[1:]: # Don't display the origin as a branch
             branch.show()
         print(f"]\n\tupper: {self.upper}")
         print(f"\tcost: {self.cost}")
@@ -31,101 +60,285 @@ class Branch():
         print(f"({self.item}, {self.is_included})", end=" ")
 
 
-def calc_upper_and_cost(path:list, S:list) -> list:
-    """ Calculates the upper bound and cost for the given path """
-    # update the status of the last added item
-    X = S[:]
-    for branch in path:
-        X[ branch.item ] = branch.is_included
+class Instance():
+    """ An instance of the knapsack problem with its items arranged in descending order
+        of their value-to-weight ratios (see sort), and the prefix sums of their weights
+        and values: items i+1..k weigh prefix_w[k] - prefix_w[i] and are worth
+        prefix_v[k] - prefix_v[i]. 'order' maps the sorted items back to the given ones.
+        An instance is integral when the weights, the values and W are all integers. """
+    def __init__(self, weights:list, values:list, W:int):
+        self.order = sorted(range(len(weights)), key=lambda i: -values[i] / weights[i])
+        self.weights = [weights[i] for i in self.order]
+        self.values = [values[i] for i in self.order]
+        self.W = W
+        self.prefix_w = [0] + list(itertools.accumulate(self.weights))
+        self.prefix_v = [0] + list(itertools.accumulate(self.values))
+        self.integral = isinstance(W, int) and all(
+            isinstance(x, int) for x in itertools.chain(weights, values))
 
-    upper = 0
-    w = 0
-    i = 0
-    while i < len(Weights) :
-        if (w + Weights[i]) <= W and X[i+1] == YES: # only consider included nodes
-            upper += (Values[i] * X[i+1])
-            w += (Weights[i] * X[i+1])
-        i += 1
 
+def calc_upper_and_cost(instance:Instance, level:int, w:int, v:int) -> list:
+    """ Calculates the upper bound and cost of a node whose items 1..level have been
+        decided, with total weight w and value v, in O(log n):
+        -> upper: the value of a feasible solution, completing the node with the longest
+           run of the next items that fits, level+1..k-1
+        -> cost: the fractional-knapsack relaxation, which also adds the fraction of
+           item k that fits; no solution below the node is worth more than this. For an
+           integral instance the optimum is an integer, so the fraction is rounded down,
+           computed exactly in integer arithmetic.
+        k is found by binary search on the prefix sums of the weights. """
+    n = len(instance.weights)
+    room = instance.W - w + instance.prefix_w[level]
+    k = bisect.bisect_right(instance.prefix_w, room, lo=level) # items level+1..k-1 fit
+    upper = v + instance.prefix_v[k-1] - instance.prefix_v[level]
     cost = upper
-    if w < W: # and a fraction of the next item's values
-        cost += (W - w) * (Values[i-1] / Weights[i-1])
-    
+    if k <= n: # and a fraction of item k's value
+        if instance.integral:
+            cost += (room - instance.prefix_w[k-1]) * instance.values[k-1] // instance.weights[k-1]
+        else:
+            cost += (room - instance.prefix_w[k-1]) * (instance.values[k-1] / instance.weights[k-1])
     return [upper, cost]
 
-def get_least_cost_node(L:list) -> Node:
-    """ Removes and returns the node with the least cost """
-    if len(L) == 1:
-        return L.pop()
-    LC_node = L[0]
-    min_cost = -1 * LC_node.cost
-    for node in L[1:]:
-        if -1 * node.cost < min_cost:
-            LC_node = node
-            min_cost = LC_node.cost
-    L.remove(LC_node)
-    return LC_node
-
-
-def kill_nodes(L:list, c:float):
-    """ Removes all nodes in L that have cost less than 'c' """
-    for node in L:
-        if node.cost < c :
-            L.remove(node)
-
 
 def should_add_branch(node:Node, n:int) -> bool:
     """ Returns True if 'node' is not the last item of the problem 
         (i.e., 'node' is not a leaf node in the state-space tree) """
-    path = node.path
-    last_branch = path[-1]
-    last_added_item = last_branch.item
-    if last_added_item == n :
+    if node.item == n :
         return False
     return True
 
 
-def add_branch(L:list, X:list, parent:Node, left:int):
-    """ Adds a branch to the state-space tree from the parent node.
-        L is a list of node, X is a list whose values indicate inclusion or exclusion of items. """
-    parent_path = parent.path
-    last_branch = parent_path[-1]
-    new_branch = Branch(b_item=last_branch.item +1, include=left)
-    new_path = parent_path + [new_branch]
-    upper, cost = calc_upper_and_cost(new_path, X)
-    new_node = Node(path=new_path, u=upper, c=cost)
-    L.append(new_node)
+def add_branch(instance:Instance, parent:Node, left:int) -> Node:
+    """ Returns the child of 'parent' in which its next item is included (left=YES)
+        or excluded (left=NO), or None if the item does not fit in the knapsack """
+    item = parent.item + 1
+    w = parent.weight + instance.weights[item-1] * left
+    v = parent.value + instance.values[item-1] * left
+    if w > instance.W:
+        return None
+    upper, cost = calc_upper_and_cost(instance, item, w, v)
+    return Node(parent, b_item=item, include=left, u=upper, c=cost, w=w, v=v)
+
+
+SHARE_INTERVAL = 64 # nodes expanded between two reads of the shared incumbent values
+SPLIT_FACTOR = 4 # live nodes handed out per worker by parallel_knapsack_BB
+
+
+class BBResult():
+    """ The outcome of a branch-and-bound search: the value and the items of the most
+        valuable subset found (the incumbent), and an upper bound on the optimal value
+        proven by the search. The gap between them is 0 when the search ran to the end;
+        when its budget ran out first, the incumbent is at most 'gap' below the optimum. """
+    def __init__(self, value:int, items:list, bound:float, nodes:int):
+        self.value = value
+        self.items = items
+        self.bound = bound
+        self.nodes = nodes
+
+    @property
+    def gap(self) -> float:
+        return max(0, self.bound - self.value)
+
+    @property
+    def is_optimal(self) -> bool:
+        return self.gap == 0
+
+    def show(self):
+        print(f"RESULT:\n\tvalue: {self.value}\n\titems: {self.items}")
+        print(f"\tbound: {self.bound} (gap {self.gap}{', optimal' if self.is_optimal else ''})")
+        print(f"\tnodes expanded: {self.nodes}")
+
+
+def search(instance:Instance, roots:list, upper_bound:float, deadline:float = None,
+           node_limit:int = None, shared:memoryview = None, slot:int = 0) -> list:
+    """ Best-first branch-and-bound below the nodes 'roots', whose solutions must be worth
+        more than 'upper_bound' to be of interest. The live nodes are kept in a heap, so the
+        node with the best cost is expanded first, and the best feasible value found so far
+        is the incumbent: a node whose cost cannot beat it is dead. Dead nodes are not
+        removed from the heap but skipped when they reach its top (lazy deletion), and the
+        search stops as soon as the best live node is dead, or when the time.time()
+        'deadline' passes or 'node_limit' nodes have been expanded.
+        If 'shared' is given, the best value it holds is read every SHARE_INTERVAL nodes to
+        prune with the incumbents of other searches, and the incumbent value of this search
+        is written into its 'slot': as every search writes only its own slot, no lock is
+        needed. The values read only raise the bound used for pruning: the incumbent of
+        this search is always a node it found itself.
+        Returns [most valuable node found (None if none beat upper_bound), live nodes left,
+        nodes expanded]; the value of the node is its upper bound. """
+    n = len(instance.weights)
+    most_valuable = None
+    counter = itertools.count() # breaks ties between nodes of equal cost
+    L = [(-node.cost, next(counter), node) for node in roots]
+    heapq.heapify(L)
+    nodes = 0
 
+    while L and -L[0][0] > upper_bound:
+        if node_limit is not None and nodes >= node_limit:
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+        _, _, cur_node = heapq.heappop(L)
+        nodes += 1
+        if shared is not None and nodes % SHARE_INTERVAL == 0:
+            upper_bound = max(upper_bound, max(shared))
+        if not should_add_branch(cur_node, n):
+            continue
+        for left in (YES, NO): # branches in which the next item is included, excluded
+            child = add_branch(instance, cur_node, left)
+            if child is None:
+                continue
+            if child.upper > upper_bound:
+                most_valuable = child
+                upper_bound = child.upper
+                if shared is not None:
+                    shared[slot] = upper_bound
+            if child.cost > upper_bound:
+                heapq.heappush(L, (-child.cost, next(counter), child))
 
-def knapsack_BB ():
+    live = [node for _, _, node in L if node.cost > upper_bound]
+    return [most_valuable, live, nodes]
+
+
+def proven_bound(value:float, costs:list) -> float:
+    """ Upper bound on the optimal value given the incumbent 'value' and the costs of the
+        live nodes left unexplored. The costs of an integral instance are exact integers
+        (see calc_upper_and_cost), and so is the bound. """
+    return max([value] + costs)
+
+
+def knapsack_BB(weights:list, values:list, W:int, time_limit:float = None,
+                node_limit:int = None) -> BBResult:
     """ Applies branch-and-bound approach to find the most valuable subset of the items that 
         fit in the knapsack. 
-        NB: The items of a given instance be MUST in descending order of their value-to-weight
-        ratios. """
-    n = len(Weights)
-    # Array of inclusion of item: YES means include the item at position i
-    X = [ YES for _ in range(n+1) ] 
-    X[0] = NO # Exclude the first (empty) node
-    starting_path = [ Branch(b_item=0, include=NO) ] # Start from an empty branch
-    upper_bound, cost = calc_upper_and_cost(starting_path, X)
-    starting_node = Node(path=starting_path, u=upper_bound, c=cost)
-
-    most_valuable = []
-
-    L = [starting_node]
-
-    while L:
-        cur_node = get_least_cost_node(L)
-        if cur_node.upper >= upper_bound:
-            most_valuable = cur_node
-            upper_bound = cur_node.upper
-            cost = cur_node.cost
-            kill_nodes(L, cost)
-        if should_add_branch(cur_node, n):
-            add_branch(L, X, parent=cur_node, left=YES) # branch in which current node is included
-            add_branch(L, X, parent=cur_node, left=NO) # branch in which current node is excluded
-
-    most_valuable.show()
+        The items are first arranged in descending order of their value-to-weight ratios,
+        and the state-space tree is explored best-first by search.
+        It is an anytime algorithm: if a time limit (in seconds) or a limit on the number
+        of nodes expanded is given and reached, the best subset found so far is returned,
+        with the bound proven on the optimum by the nodes left unexplored.
+        Returns a BBResult whose items are numbered from 1 in the order they were given. """
+    instance = Instance(weights, values, W)
+    deadline = None if time_limit is None else time.time() + time_limit
+    upper_bound, cost = calc_upper_and_cost(instance, 0, 0, 0)
+    # Start from an empty branch
+    starting_node = Node(None, b_item=0, include=NO, u=upper_bound, c=cost)
+
+    most_valuable, live, nodes = search(instance, [starting_node], upper_bound, deadline,
+                                        node_limit)
+    most_valuable = most_valuable or starting_node # the incumbent, worth its upper bound
+    value = most_valuable.upper
+    return BBResult(value, selected_items(instance, most_valuable),
+                    proven_bound(value, [node.cost for node in live]), nodes)
+
+
+def selected_items(instance:Instance, node:Node) -> list:
+    """ Items (numbered from 1 as given) of the feasible solution of 'node' valued by
+        its upper bound: the items included along its path, then the items that its
+        greedy completion adds. Only the path of the final incumbent is reconstructed. """
+    level = node.item
+    included = [branch.item for branch in node.path()[1:] if branch.is_included == YES]
+    room = instance.W - node.weight + instance.prefix_w[level]
+    k = bisect.bisect_right(instance.prefix_w, room, lo=level)
+    included += range(level + 1, k)
+    return sorted(instance.order[item-1] + 1 for item in included)
+
+
+def search_shared(instance:Instance, roots:list, name:str, slot:int, deadline:float,
+                  node_limit:int) -> list:
+    """ Worker: search below 'roots', sharing incumbent values with the other workers
+        through the shared memory block 'name', in which it owns slot 'slot'.
+        Returns [value and items of the incumbent found by this search (None, None if it
+        found none better than the shared ones), best cost of the live nodes left (None if
+        there are none), nodes expanded] """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        incumbents = block.buf.cast("d")
+        most_valuable, live, nodes = search(instance, roots, max(incumbents), deadline,
+                                            node_limit, incumbents, slot)
+        incumbents.release()
+    finally:
+        block.close()
+    bound = max((node.cost for node in live), default=None)
+    if most_valuable is None:
+        return [None, None, bound, nodes]
+    return [most_valuable.upper, selected_items(instance, most_valuable), bound, nodes]
+
+
+def parallel_knapsack_BB(weights:list, values:list, W:int, workers:int = None,
+                         time_limit:float = None, node_limit:int = None) -> BBResult:
+    """ Solves the knapsack problem like knapsack_BB on a pool of 'workers' processes
+        (os.cpu_count() by default). The search first runs in the calling process until
+        about SPLIT_FACTOR live nodes per worker are left; these are the roots of disjoint
+        subtrees, which are dealt out to the workers in decreasing order of cost so that
+        every worker gets promising ones. The workers keep their incumbent values in a
+        shared memory block, one slot each, and prune with the best of them, so that a
+        good subset found by any worker speeds up all the others.
+        The time limit applies to the whole search and the node limit is split evenly
+        between the workers. """
+    instance = Instance(weights, values, W)
+    workers = workers or os.cpu_count() or 1
+    deadline = None if time_limit is None else time.time() + time_limit
+    upper_bound, cost = calc_upper_and_cost(instance, 0, 0, 0)
+    # Start from an empty branch
+    starting_node = Node(None, b_item=0, include=NO, u=upper_bound, c=cost)
+
+    split = SPLIT_FACTOR * workers
+    if node_limit is not None:
+        split = min(split, node_limit)
+    most_valuable, live, nodes = search(instance, [starting_node], upper_bound, deadline, split)
+    most_valuable = most_valuable or starting_node # the incumbent, worth its upper bound
+    value = most_valuable.upper
+    items = selected_items(instance, most_valuable)
+    if node_limit is not None:
+        node_limit = -(-(node_limit - nodes) // workers)
+    if not live or node_limit == 0:
+        return BBResult(value, items, proven_bound(value, [node.cost for node in live]), nodes)
+
+    live.sort(key=lambda node: -node.cost)
+    groups = [live[i::workers] for i in range(min(workers, len(live)))]
+    block = shared_memory.SharedMemory(create=True, size=8 * len(groups))
+    incumbents = block.buf.cast("d")
+    for slot in range(len(groups)):
+        incumbents[slot] = value
+    try:
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            results = list(pool.map(search_shared, [instance] * len(groups), groups,
+                                    [block.name] * len(groups), range(len(groups)),
+                                    [deadline] * len(groups), [node_limit] * len(groups)))
+    finally:
+        incumbents.release()
+        block.close()
+        block.unlink()
+
+    costs = []
+    for worker_value, worker_items, worker_bound, worker_nodes in results:
+        if worker_value is not None and worker_value > value:
+            value, items = worker_value, worker_items
+        if worker_bound is not None:
+            costs.append(worker_bound)
+        nodes += worker_nodes
+    return BBResult(value, items, proven_bound(value, costs), nodes)
+
+
+def node_memory(sizes:tuple = (100, 1_000, 10_000, 100_000)) -> dict:
+    """ Measures, with tracemalloc, the memory taken by the nodes of a path of each of
+        the given depths in the state-space tree, every node of which is kept alive as
+        the live nodes of a long branch are, and prints it per node: it levels off at a
+        constant (small integers are shared, hence the lower figure for short paths),
+        where copying the path into every node made it grow linearly with the depth. """
+    per_node = {}
+    for n in sizes:
+        instance = Instance([1] * n, [1] * n, n)
+        tracemalloc.start()
+        start = tracemalloc.take_snapshot()
+        nodes = [Node(None, b_item=0, include=NO, u=0, c=0)]
+        for _ in range(n):
+            nodes.append(add_branch(instance, nodes[-1], NO))
+        used = tracemalloc.take_snapshot().compare_to(start, "filename")
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in used) - sys.getsizeof(nodes)
+        per_node[n] = size / len(nodes)
+        print(f"depth {n:>8}: {per_node[n]:.1f} bytes per node")
+    return per_node
 
 
 def sort():
@@ -167,4 +380,13 @@ if __name__ == "__main__":
     sort()
     print(f"Values:  {Values}")
     print(f"weights: {Weights}")
-    knapsack_BB()
+    knapsack_BB(Weights, Values, W).show()
+
+    # import random
+    # Weights = [random.randint(1, 100) for _ in range(500)]
+    # Values = [random.randint(1, 100) for _ in range(500)]
+    # knapsack_BB(Weights, Values, 5000).show()
+    # knapsack_BB(Weights, Values, 5000, time_limit=0.01).show()
+    # parallel_knapsack_BB(Weights, Values, 5000, workers=4).show()
+
+    # node_memory()